@@ -1,3 +1,7 @@
+import sys
+import time
+_import_started, _modules_before = time.perf_counter(), set(sys.modules)
+
 from flask import Flask 
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
@@ -5,6 +9,9 @@ from flask_migrate import Migrate
 from authlib.integrations.flask_client import OAuth
 import os
 from flask_bootstrap import Bootstrap5
+from .startup import StartupTimer, schema_is_current
+
+_import_finished = time.perf_counter()
 
 # Initialize extensions
 db = SQLAlchemy()
@@ -13,47 +20,88 @@ migrate = Migrate()
 oauth = OAuth()
 
 def create_app():
+    timer = StartupTimer()
+    timer.record('imports', _import_started, _import_finished, _modules_before)
     app = Flask(__name__)
     app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'your-secret-key-here')
     app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('SQLITE_DB_URI', 'sqlite:///epl_predictions.db')
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     app.config['GOOGLE_CLIENT_ID'] = os.environ.get('GOOGLE_CLIENT_ID')
     app.config['GOOGLE_CLIENT_SECRET'] = os.environ.get('GOOGLE_CLIENT_SECRET')
+    # 'auto' skips db.create_all() when the database is stamped with the latest migration,
+    # 'create' always runs it, 'skip' never does.
+    app.config['SCHEMA_STARTUP'] = os.environ.get('SCHEMA_STARTUP', 'auto')
+    app.config['STARTUP_TIMINGS'] = bool(os.environ.get('STARTUP_TIMINGS'))
+    # Batch prediction submissions through one writer thread (see app/group_commit.py).
+    app.config['PREDICTION_GROUP_COMMIT'] = bool(os.environ.get('PREDICTION_GROUP_COMMIT'))
+
+    with timer.phase('extensions'):
+        from .sqlite import configure_sqlite, install_sqlite_pragmas
+        configure_sqlite(app)
+
+        # Initialize extensions with app
+        db.init_app(app)
+        install_sqlite_pragmas(app)
+        migrate.init_app(app, db)
+        login_manager.init_app(app)
+        login_manager.login_view = 'main.login'
+        oauth.init_app(app)
+        Bootstrap5(app)
+
+    with timer.phase('models'):
+        # IMPORTANT: Import models AFTER db.init_app() but BEFORE register_blueprint
+        from . import models
+
+    with timer.phase('services'):
+        from .jobs import job_runner
+        job_runner.init_app(app)
+
+        from .events import event_publisher
+        event_publisher.init_app(app)
+
+        from .metrics import metrics
+        metrics.init_app(app)
+
+        from .group_commit import prediction_writer
+        prediction_writer.init_app(app)
+
+        from .fragments import fragment_cache
+        fragment_cache.init_app(app)
+
+        # Google OAuth registration
+        google = oauth.register(
+            name='google',
+            client_id=app.config['GOOGLE_CLIENT_ID'],
+            client_secret=app.config['GOOGLE_CLIENT_SECRET'],
+            server_metadata_url='https://accounts.google.com/.well-known/openid-configuration',
+            client_kwargs={
+                'scope': 'openid email profile'
+            }
+        )
+
+    # User loader: a cached Identity rather than a User query on every request
+    from .identity import load_identity
 
-    # Initialize extensions with app
-    db.init_app(app)
-    migrate.init_app(app, db)
-    login_manager.init_app(app)
-    login_manager.login_view = 'main.login'
-    oauth.init_app(app)
-    Bootstrap5(app)
-
-    # IMPORTANT: Import models AFTER db.init_app() but BEFORE register_blueprint
-    from . import models
-
-    # Google OAuth registration
-    google = oauth.register(
-        name='google',
-        client_id=app.config['GOOGLE_CLIENT_ID'],
-        client_secret=app.config['GOOGLE_CLIENT_SECRET'],
-        server_metadata_url='https://accounts.google.com/.well-known/openid-configuration',
-        client_kwargs={
-            'scope': 'openid email profile'
-        }
-    )
-
-    # User loader
     @login_manager.user_loader
     def load_user(user_id):
-        return models.User.query.get(int(user_id))
+        return load_identity(int(user_id))
 
-    # Register blueprints
-    from .routes import bp as main_bp
-    app.register_blueprint(main_bp)
+    with timer.phase('blueprints'):
+        # Register blueprints
+        from .routes import bp as main_bp
+        app.register_blueprint(main_bp)
 
-    with app.app_context():
-        # Create tables if they don't exist
-        db.create_all()
-        
-    return app
+        from .commands import register_commands
+        register_commands(app)
+
+    with timer.phase('schema'), app.app_context():
+        schema_startup = app.config['SCHEMA_STARTUP']
+        if schema_startup == 'create' or (schema_startup == 'auto' and not schema_is_current(app, db.engine)):
+            # Create tables if they don't exist
+            db.create_all()
 
+    app.extensions['startup_timer'] = timer
+    if app.config['STARTUP_TIMINGS']:
+        app.logger.warning('Startup timings:\n%s', timer.report())
+
+    return app
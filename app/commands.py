@@ -0,0 +1,66 @@
+import click
+
+from . import db
+from .leaderboard import invalidate_leaderboards, rebuild_all_snapshots
+from .models import Fixture, LiveScore, Week
+
+
+def register_commands(app):
+    @app.cli.command('rebuild-points')
+    @click.option('--check', is_flag=True, help='Only report drift, do not rebuild.')
+    def rebuild_points_command(check):
+        """Rebuild prediction, match week and total points from Prediction rows."""
+        from .scoring import find_drift, rebuild_points
+
+        drift = find_drift()
+        for user_id, match_week_id, stored, expected in drift['match_weeks']:
+            click.echo(f'MatchWeekPoint drift: user {user_id} match week {match_week_id}: {stored} != {expected}')
+        for user_id, stored, expected in drift['users']:
+            click.echo(f'total_points drift: user {user_id}: {stored} != {expected}')
+        click.echo(f'{len(drift["match_weeks"])} match week rows and {len(drift["users"])} users drifted.')
+
+        if check:
+            if drift['match_weeks'] or drift['users']:
+                raise SystemExit(1)
+            return
+
+        result = rebuild_points()
+        db.session.commit()
+        invalidate_leaderboards()
+        click.echo(f'Rebuilt {result["match_weeks"]} match weeks from {result["predictions"]} predictions.')
+
+    @app.cli.command('rebuild-leaderboards')
+    def rebuild_leaderboards_command():
+        """Build the overall and weekly leaderboard snapshots, e.g. after a deploy or restoring a database."""
+        match_weeks = rebuild_all_snapshots()
+        db.session.commit()
+        invalidate_leaderboards()
+        click.echo(f'Rebuilt the overall leaderboard and {match_weeks} match week leaderboards.')
+
+    @app.cli.command('live-score')
+    @click.argument('fixture_id', type=int)
+    @click.argument('home_score', type=click.IntRange(min=0))
+    @click.argument('away_score', type=click.IntRange(min=0))
+    def live_score_command(fixture_id, home_score, away_score):
+        """Feed an in-play score into the live standings, e.g. from a score feed script."""
+        from .live import apply_live_scores
+
+        if db.session.get(Fixture, fixture_id) is None:
+            raise click.ClickException(f'Fixture {fixture_id} does not exist.')
+        rows = [{'fixture_id': fixture_id, 'home_score': home_score, 'away_score': away_score}]
+        LiveScore.record(rows)
+        db.session.commit()
+        apply_live_scores(rows)
+        click.echo(f'Fixture {fixture_id}: {home_score}-{away_score}')
+
+    @app.cli.command('seed-weeks')
+    def seed_weeks_command():
+        """Create the Premier League weeks 1-38 that do not exist yet."""
+        created = Week.seed()
+        db.session.commit()
+        click.echo(f'Created {created} weeks.' if created else 'All weeks already exist.')
+
+    @app.cli.command('startup-report')
+    def startup_report_command():
+        """Print how long each phase of create_app() took in this process."""
+        click.echo(app.extensions['startup_timer'].report())
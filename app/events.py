@@ -0,0 +1,204 @@
+"""
+Server-Sent Events for live standings, results and prediction windows.
+
+One publisher thread per process watches the cheap, already-cached state
+(the open-week snapshot and the live board, which itself syncs with the
+database every couple of seconds) and fans changes out to every connected
+client through a small queue per subscriber. Because the publisher derives
+events from shared state rather than from the request that caused them,
+clients see the same events whichever gunicorn worker they are connected to.
+
+Each open stream holds one of the worker's gunicorn threads for the whole
+connection. The workers stay on real threads (gthread) because scoring,
+exports, the group-commit writer and SQLite's busy wait all block, and under
+a single-threaded event loop any of them would freeze every request and
+stream of the worker. SSE_MAX_CLIENTS therefore caps streams per worker well
+below --threads (see the Dockerfile) so ordinary page requests always have
+room; clients beyond the cap get a 503 and fall back to polling. Streams are
+closed after SSE_MAX_DURATION seconds and the browser's EventSource
+reconnects on its own.
+"""
+
+import json
+import logging
+import queue
+import threading
+import time
+
+from . import db
+
+logger = logging.getLogger(__name__)
+
+MAX_RANK_CHANGES = 200
+
+
+class Subscription:
+
+    def __init__(self, maxsize):
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.closed = False
+
+    def get(self, timeout):
+        return self.queue.get(timeout=timeout)
+
+
+def format_event(event, data):
+    return f'event: {event}\ndata: {json.dumps(data, default=str)}\n\n'
+
+
+class EventPublisher:
+
+    def __init__(self, app=None):
+        self.app = None
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._open_weeks = None
+        self._board_key = None
+        self._board_week = None
+        self._fixtures = {}
+        self._ranks = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('SSE_POLL_INTERVAL', 2)
+        app.config.setdefault('SSE_HEARTBEAT', 15)
+        app.config.setdefault('SSE_MAX_CLIENTS', 24)
+        app.config.setdefault('SSE_MAX_DURATION', 5 * 60)
+        app.config.setdefault('SSE_QUEUE_SIZE', 64)
+        app.extensions['event_publisher'] = self
+        self.app = app
+
+    def has_capacity(self):
+        with self._lock:
+            return len(self._subscribers) < self.app.config['SSE_MAX_CLIENTS']
+
+    def subscribe(self):
+        """Register a new client; returns None when the per-process cap is reached."""
+        with self._lock:
+            if len(self._subscribers) >= self.app.config['SSE_MAX_CLIENTS']:
+                return None
+            subscription = Subscription(self.app.config['SSE_QUEUE_SIZE'])
+            self._subscribers.add(subscription)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name='sse-publisher', daemon=True)
+                self._thread.start()
+            return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+        subscription.closed = True
+
+    def publish(self, event, data):
+        """Send an event to every subscriber; clients too slow to keep up are dropped and reconnect."""
+        message = format_event(event, data)
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            try:
+                subscription.queue.put_nowait(message)
+            except queue.Full:
+                self.unsubscribe(subscription)
+
+    def stream(self):
+        """
+        Generator for the response body of one client. The client is only
+        subscribed once the body is first iterated, so a response that is
+        never sent cannot hold a slot.
+        """
+        subscription = self.subscribe()
+        if subscription is None:
+            # Filled up between the view's capacity check and the first byte: ask the client to come back later.
+            yield 'retry: 30000\n\n'
+            return
+        heartbeat = self.app.config['SSE_HEARTBEAT']
+        deadline = time.monotonic() + self.app.config['SSE_MAX_DURATION']
+        try:
+            yield 'retry: 5000\n\n'
+            while not subscription.closed and time.monotonic() < deadline:
+                try:
+                    yield subscription.get(timeout=heartbeat)
+                except queue.Empty:
+                    yield ': keepalive\n\n'
+        finally:
+            self.unsubscribe(subscription)
+
+    def _loop(self):
+        while True:
+            time.sleep(self.app.config['SSE_POLL_INTERVAL'])
+            with self._lock:
+                if not self._subscribers:
+                    continue
+            with self.app.app_context():
+                try:
+                    self.poll()
+                except Exception:
+                    logger.exception('SSE publisher poll failed')
+                finally:
+                    db.session.remove()
+
+    def poll(self):
+        """Compare the current state with the last poll and publish what changed."""
+        self._poll_windows()
+        self._poll_board()
+
+    def _poll_windows(self):
+        from .open_week import get_open_snapshot
+
+        snapshot = get_open_snapshot()
+        open_weeks = {mw.id: mw for mw in snapshot.active_match_weeks if mw.is_predictions_open}
+        if self._open_weeks is not None:
+            for match_week_id in open_weeks.keys() - self._open_weeks.keys():
+                match_week = open_weeks[match_week_id]
+                self.publish('window', {'match_week_id': match_week_id, 'week_number': match_week.week_number,
+                                        'open': True, 'closes_at': match_week.predictions_close_time})
+            for match_week_id in self._open_weeks.keys() - open_weeks.keys():
+                self.publish('window', {'match_week_id': match_week_id,
+                                        'week_number': self._open_weeks[match_week_id].week_number,
+                                        'open': False})
+        self._open_weeks = open_weeks
+
+    def _poll_board(self):
+        from .live import get_live_board
+
+        board = get_live_board()
+        if board is None:
+            self._board_key, self._board_week, self._fixtures, self._ranks = None, None, {}, {}
+            return
+        key = (id(board), board.version)
+        if key == self._board_key:
+            return
+
+        fixtures = {fixture['id']: fixture for fixture in board.fixtures}
+        ranks = {row['id']: (row['rank'], row['points']) for row in board.standings()}
+
+        if self._board_key is None:
+            pass  # first look: nothing to compare against yet
+        elif board.match_week_id != self._board_week:
+            self.publish('standings', {'match_week_id': board.match_week_id, 'version': board.version,
+                                       'changes': None})
+        else:
+            for fixture_id, fixture in fixtures.items():
+                previous = self._fixtures.get(fixture_id)
+                if previous and (previous['home_score'], previous['away_score']) != \
+                        (fixture['home_score'], fixture['away_score']):
+                    self.publish('result', {'match_week_id': board.match_week_id, **fixture})
+            changes = [
+                {'id': user_id, 'rank': rank, 'points': points}
+                for user_id, (rank, points) in ranks.items() if self._ranks.get(user_id) != (rank, points)
+            ]
+            if changes:
+                # Past MAX_RANK_CHANGES the client is better off re-fetching /api/live.
+                self.publish('standings', {
+                    'match_week_id': board.match_week_id,
+                    'version': board.version,
+                    'changes': changes if len(changes) <= MAX_RANK_CHANGES else None,
+                })
+
+        self._board_key, self._board_week = key, board.match_week_id
+        self._fixtures, self._ranks = fixtures, ranks
+
+
+event_publisher = EventPublisher()
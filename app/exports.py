@@ -0,0 +1,115 @@
+"""
+Leaderboard exports.
+
+Rows are streamed from the precomputed standings (fetched in batches with
+yield_per) straight into the PDF or write-only workbook, which is written to a
+file on disk by a background job, so memory use stays flat for large leagues.
+No intermediate lists or DataFrames are built. Each new export first deletes
+the files of exports older than EXPORT_MAX_AGE.
+"""
+
+import os
+import tempfile
+import time
+
+from fpdf import FPDF
+from openpyxl import Workbook
+from .leaderboard import iter_standings, OVERALL
+
+BATCH_SIZE = 500
+
+HEADERS = ('Rank', 'Name', 'Nickname', 'Points')
+PDF_COLUMN_WIDTHS = (20, 70, 60, 30)
+
+
+def iter_weekly_rows(match_week_id):
+    """Yield (rank, name, nickname, points) for a match week in rank order."""
+    return iter_standings(match_week_id, batch_size=BATCH_SIZE)
+
+
+def iter_overall_rows():
+    """Yield (rank, name, nickname, total_points) for every player in leaderboard order."""
+    return iter_standings(OVERALL, batch_size=BATCH_SIZE)
+
+
+def _pdf_text(value):
+    # The core PDF fonts only cover latin-1.
+    return str(value if value is not None else '').encode('latin-1', 'replace').decode('latin-1')
+
+
+def write_pdf(rows, fileobj, title, subtitle=''):
+    pdf = FPDF()
+    pdf.set_auto_page_break(auto=True, margin=15)
+    pdf.add_page()
+
+    pdf.set_font('Helvetica', 'B', 16)
+    pdf.cell(0, 10, _pdf_text(title), align='C', new_x='LMARGIN', new_y='NEXT')
+    if subtitle:
+        pdf.set_font('Helvetica', '', 12)
+        pdf.cell(0, 8, _pdf_text(subtitle), align='C', new_x='LMARGIN', new_y='NEXT')
+    pdf.ln(4)
+
+    def header():
+        pdf.set_font('Helvetica', 'B', 11)
+        for width, text in zip(PDF_COLUMN_WIDTHS, HEADERS):
+            pdf.cell(width, 8, text, border=1, align='C', new_x='RIGHT', new_y='TOP')
+        pdf.ln()
+        pdf.set_font('Helvetica', '', 10)
+
+    header()
+    for row in rows:
+        if pdf.will_page_break(7):
+            pdf.add_page()
+            header()
+        for width, value in zip(PDF_COLUMN_WIDTHS, row):
+            pdf.cell(width, 7, _pdf_text(value), border=1, new_x='RIGHT', new_y='TOP')
+        pdf.ln()
+
+    pdf.output(fileobj)
+
+
+def write_xlsx(rows, fileobj, sheet_title):
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=sheet_title[:31])
+    sheet.append(HEADERS)
+    for row in rows:
+        sheet.append(row)
+    workbook.save(fileobj)
+
+
+def build_export(fileobj, format, scope, match_week_id=None, title='', subtitle=''):
+    """Write the ``scope`` ('overall' or 'weekly') leaderboard to ``fileobj`` as 'pdf' or 'xlsx'."""
+    rows = iter_overall_rows() if scope == 'overall' else iter_weekly_rows(match_week_id)
+    if format == 'pdf':
+        write_pdf(rows, fileobj, title, subtitle)
+    elif format == 'xlsx':
+        write_xlsx(rows, fileobj, title)
+    else:
+        raise ValueError(f'Unknown export format {format!r}')
+
+
+def export_to_path(directory, filename, **options):
+    """Build an export into a new file under ``directory`` and return its path."""
+    fd, path = tempfile.mkstemp(dir=directory, prefix='export-', suffix=os.path.splitext(filename)[1])
+    try:
+        with os.fdopen(fd, 'wb') as fileobj:
+            build_export(fileobj, **options)
+    except Exception:
+        os.remove(path)
+        raise
+    return path
+
+
+def remove_expired_exports(directory, max_age):
+    """Delete exports under ``directory`` older than ``max_age`` seconds; returns how many were removed."""
+    cutoff = time.time() - max_age
+    removed = 0
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.name.startswith('export-') and entry.is_file() and entry.stat().st_mtime < cutoff:
+                try:
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    continue
+                removed += 1
+    return removed
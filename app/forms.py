@@ -1,6 +1,6 @@
 from flask_wtf import FlaskForm
 from wtforms import StringField, IntegerField, SelectField, DateTimeField, FieldList, FormField, SubmitField, DateTimeLocalField
-from wtforms.validators import DataRequired, NumberRange
+from wtforms.validators import DataRequired, NumberRange, Optional
 from datetime import datetime
 
 
@@ -23,9 +23,8 @@ class FixtureForm(FlaskForm):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        from .models import Team  # Import here to avoid circular import
-        teams = Team.query.order_by(Team.name).all()
-        choices = [(team.id, f"{team.name}") for team in teams]
+        from .teams import get_teams  # Import here to avoid circular import
+        choices = get_teams().choices()
         self.home_team.choices = choices
         self.away_team.choices = choices
 
@@ -121,6 +120,20 @@ class MatchRowForm(FlaskForm):
     away_score = IntegerField('Away Score', validators=[NumberRange(min=0, message="Score must be 0 or greater")])
 
 
+class ResultRowForm(MatchRowForm):
+    """
+    A result row for update_scores. Scores may be left blank for matches that
+    have not been played yet, so a match week can be completed over several days.
+    """
+    home_score = IntegerField('Home Score', validators=[Optional(), NumberRange(min=0, message="Score must be 0 or greater")])
+    away_score = IntegerField('Away Score', validators=[Optional(), NumberRange(min=0, message="Score must be 0 or greater")])
+
+
+class DynamicResultsForm(FlaskForm):
+    matches = FieldList(FormField(ResultRowForm), min_entries=1)
+    submit = SubmitField('Submit Scores')
+
+
 # This is the main dynamic form. It uses a FieldList to hold multiple instances of MatchRowForm.
 class DynamicMatchesForm(FlaskForm):
     """
@@ -0,0 +1,136 @@
+"""
+Rendered HTML fragment cache.
+
+Parts of busy pages render the same HTML for every user: the fixture lists
+on the admin dashboard, the print-fixtures table, the match week cards on
+the home page. Those parts are cached per process, keyed on a fragment name,
+a match week id and the data versions (see app/versions.py) of that match
+week and of the shared data, so any committed write to them simply makes
+new keys and the stale entries age out of the LRU. The cache is bounded by
+FRAGMENT_CACHE_BYTES of rendered HTML.
+
+From a template, wrap the shared part in a call block; the body is only
+rendered on a miss, so it must not use current_user or anything else that
+differs per user. Per-user parts render around the block as usual:
+
+    {% call fragment('index-card', match_week.id, match_week.is_predictions_open) %}
+        ...
+    {% endcall %}
+
+Extra arguments after the match week id (here, whether the window is open)
+become part of the key. From a view, cached_fragment() and
+cached_fragments() take a render callable instead, so the data a fragment
+needs is only loaded on a miss.
+"""
+
+import threading
+from collections import OrderedDict
+
+from markupsafe import Markup
+
+from .versions import GLOBAL, get_versions
+
+
+class FragmentCache:
+
+    def __init__(self, app=None):
+        self.app = None
+        self.maxbytes = 0
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('FRAGMENT_CACHE_BYTES', 16 * 1024 * 1024)
+        app.extensions['fragment_cache'] = self
+        app.jinja_env.globals['fragment'] = _template_fragment
+        self.app = app
+        self.maxbytes = app.config['FRAGMENT_CACHE_BYTES']
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, html):
+        size = len(html.encode('utf-8'))
+        if size > self.maxbytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= previous[1]
+            self._entries[key] = (html, size)
+            self.size += size
+            while self.size > self.maxbytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.size -= evicted
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self.size, 'max_bytes': self.maxbytes,
+                    'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
+
+
+fragment_cache = FragmentCache()
+
+
+def _key(versions, name, match_week_id, vary):
+    return (name, match_week_id, versions.get(GLOBAL, (0,))[0], versions.get(match_week_id, (0,))[0]) + vary
+
+
+def fragment_key(name, match_week_id, *vary):
+    """Cache key of a fragment at the current data versions."""
+    return _key(get_versions(), name, match_week_id, vary)
+
+
+def cached_fragment(name, match_week_id, render, *vary):
+    """Return the cached fragment, calling ``render()`` for its HTML on a miss."""
+    key = fragment_key(name, match_week_id, *vary)
+    html = fragment_cache.get(key)
+    if html is None:
+        html = str(render())
+        fragment_cache.set(key, html)
+    return Markup(html)
+
+
+def cached_fragments(name, match_week_ids, render_missing, *vary):
+    """
+    Return ``{match_week_id: fragment}`` for several match weeks at once.
+    ``render_missing(ids)`` is called once with the ids that missed and
+    returns ``{match_week_id: html}`` for them, so their data can be loaded
+    in one query.
+    """
+    versions = get_versions()
+    keys = {match_week_id: _key(versions, name, match_week_id, vary) for match_week_id in match_week_ids}
+    fragments = {}
+    for match_week_id, key in keys.items():
+        html = fragment_cache.get(key)
+        if html is not None:
+            fragments[match_week_id] = Markup(html)
+    missing = [match_week_id for match_week_id in keys if match_week_id not in fragments]
+    if missing:
+        for match_week_id, html in render_missing(missing).items():
+            fragment_cache.set(keys[match_week_id], str(html))
+            fragments[match_week_id] = Markup(html)
+    return fragments
+
+
+def _template_fragment(name, match_week_id=GLOBAL, *vary, caller):
+    return cached_fragment(name, match_week_id, caller, *vary)
@@ -0,0 +1,130 @@
+"""
+Optional write-behind group commit for prediction submissions.
+
+In the last minutes before a deadline every predict() submission is its own
+write transaction queueing for SQLite's single writer lock. With
+PREDICTION_GROUP_COMMIT enabled, the view validates the form and hands its
+rows to a single writer thread per process instead. The writer collects
+whatever arrives within PREDICTION_BATCH_WINDOW seconds (up to
+PREDICTION_BATCH_MAX submissions), writes them with one upsert and one
+commit, and then releases each waiting request. A request is only told its
+predictions are saved once they are durable.
+
+If a batch fails, its submissions are retried one at a time so a single bad
+submission cannot fail the others. The deadline is checked by the view
+against the time the request arrived, so a submission that arrived in time
+is saved even if its batch is flushed just after the deadline.
+"""
+
+import logging
+import queue
+import threading
+import time
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from . import db
+from .models import Prediction
+
+logger = logging.getLogger(__name__)
+
+
+class Ticket:
+    """One submission waiting for its batch to be committed."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.error = None
+        self._done = threading.Event()
+
+    def resolve(self, error=None):
+        self.error = error
+        self._done.set()
+
+    def wait(self, timeout):
+        """Block until the rows are committed; re-raise the write error, or TimeoutError."""
+        if not self._done.wait(timeout):
+            raise TimeoutError('Timed out waiting for predictions to be saved.')
+        if self.error is not None:
+            raise self.error
+
+
+class PredictionWriter:
+
+    def __init__(self, app=None):
+        self.app = None
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('PREDICTION_GROUP_COMMIT', False)
+        app.config.setdefault('PREDICTION_BATCH_WINDOW', 0.005)
+        app.config.setdefault('PREDICTION_BATCH_MAX', 500)
+        app.config.setdefault('PREDICTION_ACK_TIMEOUT', 10)
+        app.extensions['prediction_writer'] = self
+        self.app = app
+
+    @property
+    def enabled(self):
+        return bool(self.app and self.app.config['PREDICTION_GROUP_COMMIT'])
+
+    def save(self, rows):
+        """Queue ``rows`` for the next batch and wait until they are committed."""
+        ticket = Ticket(rows)
+        self._ensure_started()
+        self._queue.put(ticket)
+        ticket.wait(self.app.config['PREDICTION_ACK_TIMEOUT'])
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name='prediction-writer', daemon=True)
+                self._thread.start()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.app.config['PREDICTION_BATCH_WINDOW']
+        while len(batch) < self.app.config['PREDICTION_BATCH_MAX']:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self):
+        while True:
+            batch = self._collect()
+            with self.app.app_context():
+                try:
+                    self._flush(batch)
+                except Exception as e:
+                    logger.exception('Prediction writer failed')
+                    for ticket in batch:
+                        if not ticket._done.is_set():
+                            ticket.resolve(e)
+                finally:
+                    db.session.remove()
+
+    def _flush(self, batch):
+        try:
+            Prediction.upsert([row for ticket in batch for row in ticket.rows])
+            db.session.commit()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            if len(batch) == 1:
+                batch[0].resolve(e)
+                return
+            for ticket in batch:
+                self._flush([ticket])
+            return
+        for ticket in batch:
+            ticket.resolve()
+
+
+prediction_writer = PredictionWriter()
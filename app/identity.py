@@ -0,0 +1,69 @@
+"""
+Cached session identity.
+
+Flask-Login calls load_user() on every authenticated request; instead of a
+User query each time, it gets a small immutable Identity with the only fields
+views and templates read from current_user (id, name, nickname, is_admin),
+cached in process for IDENTITY_TTL seconds. Committed changes to a User row
+made through the ORM (login refreshing the name, admin edits) drop that
+user's entry on commit, so this worker sees them at once and other workers
+within the TTL.
+"""
+
+from collections import namedtuple
+
+from flask_login import UserMixin
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, object_session
+
+from . import db
+from .cache import TTLCache
+from .models import User
+
+IDENTITY_TTL = 60
+
+identity_cache = TTLCache(maxsize=4096, ttl=IDENTITY_TTL)
+
+
+class Identity(UserMixin, namedtuple('Identity', ['id', 'name', 'nickname', 'is_admin'])):
+    __slots__ = ()
+
+
+def _fetch_identity(user_id):
+    row = db.session.execute(
+        select(User.id, User.name, User.nickname, User.is_admin).where(User.id == user_id)
+    ).first()
+    return Identity(row.id, row.name, row.nickname, bool(row.is_admin)) if row else None
+
+
+def load_identity(user_id):
+    """Return the Identity for ``user_id`` (None if the user does not exist)."""
+    identity = identity_cache.get(user_id)
+    if identity is None:
+        identity = _fetch_identity(user_id)
+        if identity is not None:
+            identity_cache.set(user_id, identity)
+    return identity
+
+
+def invalidate_identity(user_id):
+    identity_cache.invalidate(user_id)
+
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _remember_changed_user(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault('changed_user_ids', set()).add(target.id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_changed_users(session):
+    for user_id in session.info.pop('changed_user_ids', ()):
+        invalidate_identity(user_id)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_changed_users(session):
+    session.info.pop('changed_user_ids', None)
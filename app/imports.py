@@ -0,0 +1,207 @@
+"""
+Bulk fixture import.
+
+A CSV or XLSX file with one fixture per row is streamed row by row (csv
+module / openpyxl read-only mode), team names and week numbers are resolved
+against maps loaded up front, and the resulting MatchWeek and Fixture rows are
+written with executemany INSERTs. Rows that cannot be imported are reported
+with their line number instead of aborting the batch.
+
+Expected columns (header names are case-insensitive):
+    week, home_team, away_team, match_datetime (optional),
+    predictions_open_time (optional), predictions_close_time (optional)
+
+When a new match week has no explicit prediction window it closes at the
+earliest kick-off of the week and opens DEFAULT_WINDOW before that.
+"""
+
+import csv
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, insert
+
+from . import db
+from .models import MatchWeek, Fixture, Week, Season
+from .teams import get_teams
+from .versions import GLOBAL, touch
+
+DEFAULT_WINDOW = timedelta(days=6)
+MAX_REPORTED_ERRORS = 200
+
+DATETIME_FORMATS = ('%Y-%m-%d %H:%M', '%Y-%m-%dT%H:%M', '%Y-%m-%d %H:%M:%S', '%d/%m/%Y %H:%M', '%Y-%m-%d')
+
+
+def _normalise_header(value):
+    return str(value or '').strip().lower().replace(' ', '_')
+
+
+def iter_csv_rows(path):
+    with open(path, newline='', encoding='utf-8-sig') as handle:
+        reader = csv.reader(handle)
+        header = [_normalise_header(name) for name in next(reader, [])]
+        for row in reader:
+            yield dict(zip(header, row))
+
+
+def iter_xlsx_rows(path):
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [_normalise_header(name) for name in next(rows, ())]
+        for row in rows:
+            yield dict(zip(header, row))
+    finally:
+        workbook.close()
+
+
+def iter_rows(path, filename):
+    """Yield one dict per data row of a .csv or .xlsx file, keyed by normalised header."""
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == '.csv':
+        return iter_csv_rows(path)
+    if extension in ('.xlsx', '.xlsm'):
+        return iter_xlsx_rows(path)
+    raise ValueError(f'Unsupported file type {extension!r}; upload a .csv or .xlsx file.')
+
+
+def _parse_datetime(value):
+    if value in (None, ''):
+        return None
+    if isinstance(value, datetime):
+        return value
+    value = str(value).strip()
+    for fmt in DATETIME_FORMATS:
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    raise ValueError(f'Unrecognised date/time {value!r}')
+
+
+def _parse_week(value):
+    try:
+        return int(float(str(value).strip()))
+    except (TypeError, ValueError):
+        raise ValueError(f'Invalid week {value!r}') from None
+
+
+def _parse_team(value):
+    # Spreadsheet cells can hold numbers (or NaN); only text can name a team.
+    if value in (None, ''):
+        raise ValueError('Missing team')
+    if not isinstance(value, str):
+        raise ValueError(f'Invalid team {value!r}')
+    return value
+
+
+def import_fixtures(path, filename, season_id):
+    """
+    Import fixtures from ``path`` into ``season_id`` and commit.
+
+    Returns a dict with the number of fixtures and match weeks created, the
+    number of rows read and a list of ``{'row': n, 'error': message}`` entries.
+    """
+    if db.session.get(Season, season_id) is None:
+        raise ValueError(f'Season {season_id} does not exist.')
+
+    teams = get_teams()
+    week_ids = dict(db.session.execute(select(Week.week_number, Week.id)).all())
+    match_week_ids = dict(db.session.execute(
+        select(MatchWeek.week_id, MatchWeek.id).where(MatchWeek.season_id == season_id)
+    ).all())
+    existing_fixtures = set(db.session.execute(
+        select(Fixture.match_week_id, Fixture.home_team_id, Fixture.away_team_id)
+        .where(Fixture.match_week_id.in_(list(match_week_ids.values())))
+    ).all())
+
+    errors = []
+    pending = {}  # week_id -> list of fixture dicts
+    windows = {}  # week_id -> [open, close, earliest kick-off]
+    seen = set()
+    rows_read = 0
+
+    for line, row in enumerate(iter_rows(path, filename), start=2):
+        if not any(value not in (None, '') for value in row.values()):
+            continue
+        rows_read += 1
+        try:
+            week_number = _parse_week(row.get('week'))
+            week_id = week_ids.get(week_number)
+            if week_id is None:
+                raise ValueError(f'Unknown week {week_number}')
+            home_name = _parse_team(row.get('home_team'))
+            away_name = _parse_team(row.get('away_team'))
+            home = teams.lookup(home_name)
+            away = teams.lookup(away_name)
+            if home is None or away is None:
+                raise ValueError(f'Unknown team {home_name if home is None else away_name!r}')
+            if home.id == away.id:
+                raise ValueError('Home and away team are the same')
+            kickoff = _parse_datetime(row.get('match_datetime'))
+            open_time = _parse_datetime(row.get('predictions_open_time'))
+            close_time = _parse_datetime(row.get('predictions_close_time'))
+        except ValueError as e:
+            errors.append({'row': line, 'error': str(e)})
+            continue
+
+        key = (week_id, home.id, away.id)
+        match_week_id = match_week_ids.get(week_id)
+        if key in seen or (match_week_id, home.id, away.id) in existing_fixtures:
+            errors.append({'row': line, 'error': f'Duplicate fixture {home.name} vs {away.name} in week {week_number}'})
+            continue
+        seen.add(key)
+
+        window = windows.setdefault(week_id, [None, None, None])
+        window[0] = window[0] or open_time
+        window[1] = window[1] or close_time
+        if kickoff and (window[2] is None or kickoff < window[2]):
+            window[2] = kickoff
+        pending.setdefault(week_id, []).append({
+            'home_team_id': home.id,
+            'away_team_id': away.id,
+            'match_datetime': kickoff,
+        })
+
+    new_match_weeks = []
+    for week_id in pending:
+        if week_id in match_week_ids:
+            continue
+        open_time, close_time, first_kickoff = windows[week_id]
+        close_time = close_time or first_kickoff
+        if close_time is None:
+            errors.append({'row': None, 'error': f'Week id {week_id}: no prediction window or kick-off times; skipped.'})
+            continue
+        new_match_weeks.append({
+            'season_id': season_id,
+            'week_id': week_id,
+            'predictions_open_time': open_time or close_time - DEFAULT_WINDOW,
+            'predictions_close_time': close_time,
+        })
+
+    if new_match_weeks:
+        created = db.session.execute(
+            insert(MatchWeek).returning(MatchWeek.week_id, MatchWeek.id), new_match_weeks
+        ).all()
+        match_week_ids.update(dict(created))
+
+    fixture_rows = [
+        {'match_week_id': match_week_ids[week_id], **fixture}
+        for week_id, fixtures in pending.items() if week_id in match_week_ids
+        for fixture in fixtures
+    ]
+    if fixture_rows:
+        db.session.execute(insert(Fixture), fixture_rows)
+    if new_match_weeks or fixture_rows:
+        touch(GLOBAL, *{row['match_week_id'] for row in fixture_rows})
+    db.session.commit()
+
+    return {
+        'rows': rows_read,
+        'count': len(fixture_rows),
+        'match_weeks': len(new_match_weeks),
+        'error_count': len(errors),
+        'errors': errors[:MAX_REPORTED_ERRORS],
+    }
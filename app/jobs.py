@@ -0,0 +1,203 @@
+"""
+Background jobs without an external broker.
+
+Jobs are persisted in the ``job`` table and executed by a small pool of OS
+threads inside each gunicorn (gthread) worker, so long admin actions
+(scoring, exports, imports) return immediately instead of holding one of the
+request threads, and their CPU and SQLite waits never stall the worker's
+other requests beyond sharing the GIL. A job is
+claimed with an atomic UPDATE, so it runs once even if several processes see
+it, and failed attempts are retried with exponential backoff.
+
+Each process starts its pool on its first request, and jobs left behind by
+a process that died are picked up again then, without waiting for someone
+to queue a new job.
+"""
+
+import logging
+import os
+import tempfile
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, update
+
+from . import db
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+_handlers = {}
+
+
+def job_handler(kind):
+    """Register ``func(payload)`` as the handler for jobs of ``kind``; it returns a JSON-able result."""
+    def decorator(func):
+        _handlers[kind] = func
+        return func
+    return decorator
+
+
+class JobRunner:
+
+    def __init__(self, app=None):
+        self.app = None
+        self._executor = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('JOB_WORKERS', 2)
+        app.config.setdefault('JOB_RETRY_DELAY', 5)
+        app.config.setdefault('JOB_LEASE', 30 * 60)
+        app.config.setdefault('EXPORT_DIR', os.path.join(tempfile.gettempdir(), 'epl-exports'))
+        # Finished exports are deleted once they are this many seconds old.
+        app.config.setdefault('EXPORT_MAX_AGE', 24 * 60 * 60)
+        app.config.setdefault('UPLOAD_DIR', os.path.join(tempfile.gettempdir(), 'epl-uploads'))
+        app.extensions['job_runner'] = self
+        app.before_request(self._start)
+        self.app = app
+
+    def _start(self):
+        if self._executor is None:
+            self._get_executor()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.app.config['JOB_WORKERS'], thread_name_prefix='job'
+                )
+                self._executor.submit(self._resume)
+            return self._executor
+
+    def submit(self, job_id, delay=0):
+        if delay:
+            timer = threading.Timer(delay, self.submit, args=(job_id,))
+            timer.daemon = True
+            timer.start()
+            return
+        self._get_executor().submit(self._run, job_id)
+
+    def _resume(self):
+        """Queue jobs that were waiting, or whose lease expired, when their process went away."""
+        with self.app.app_context():
+            stale = datetime.utcnow() - timedelta(seconds=self.app.config['JOB_LEASE'])
+            db.session.execute(
+                update(Job).where(Job.status == 'running', Job.started_at < stale).values(status='queued'),
+                execution_options={'synchronize_session': False}
+            )
+            db.session.commit()
+            job_ids = db.session.scalars(select(Job.id).where(Job.status == 'queued')).all()
+        for job_id in job_ids:
+            self._executor.submit(self._run, job_id)
+
+    def _claim(self, job_id):
+        claimed = db.session.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.status == 'queued')
+            .values(status='running', attempts=Job.attempts + 1, started_at=datetime.utcnow(), error=None),
+            execution_options={'synchronize_session': False}
+        ).rowcount
+        db.session.commit()
+        return claimed == 1
+
+    def _run(self, job_id):
+        with self.app.app_context():
+            claimed = False
+            try:
+                claimed = self._claim(job_id)
+                if not claimed:
+                    return
+                job = db.session.get(Job, job_id)
+                handler = _handlers.get(job.kind)
+                if handler is None:
+                    raise LookupError(f'No handler registered for job kind {job.kind!r}')
+                result = handler(job.payload or {})
+            except Exception:
+                db.session.rollback()
+                self._fail(job_id, traceback.format_exc(), claimed)
+                return
+
+            job.status = 'done'
+            job.result = result
+            job.finished_at = datetime.utcnow()
+            db.session.commit()
+
+    def _fail(self, job_id, error, claimed=True):
+        job = db.session.get(Job, job_id)
+        if job is None:
+            return
+        if not claimed:
+            # The claim itself failed (e.g. the database was locked), so this attempt was never counted.
+            # Leave the job alone if another process has claimed it since.
+            if job.status != 'queued':
+                return
+            job.attempts += 1
+        logger.error('Job %s (%s) failed on attempt %s:\n%s', job.id, job.kind, job.attempts, error)
+        job.error = error
+        if job.attempts < job.max_attempts:
+            job.status = 'queued'
+            db.session.commit()
+            self.submit(job.id, delay=self.app.config['JOB_RETRY_DELAY'] * 2 ** (job.attempts - 1))
+        else:
+            job.status = 'failed'
+            job.finished_at = datetime.utcnow()
+            db.session.commit()
+
+
+job_runner = JobRunner()
+
+
+def enqueue(kind, payload=None, user_id=None, max_attempts=3):
+    """Persist a job, commit it and hand it to the pool. Returns the Job."""
+    if kind not in _handlers:
+        raise LookupError(f'No handler registered for job kind {kind!r}')
+    job = Job(kind=kind, payload=payload or {}, created_by_id=user_id, max_attempts=max_attempts)
+    db.session.add(job)
+    db.session.commit()
+    job_runner.submit(job.id)
+    return job
+
+
+# ######### JOB HANDLERS ########
+
+@job_handler('score_match_week')
+def _score_match_week(payload):
+    from .leaderboard import invalidate_leaderboards
+    from .scoring import score_match_week
+
+    result = score_match_week(payload['match_week_id'])
+    db.session.commit()
+    invalidate_leaderboards()
+    return result
+
+
+@job_handler('export')
+def _export(payload):
+    from flask import current_app
+    from .exports import export_to_path, remove_expired_exports
+
+    export_dir = current_app.config['EXPORT_DIR']
+    os.makedirs(export_dir, exist_ok=True)
+    remove_expired_exports(export_dir, current_app.config['EXPORT_MAX_AGE'])
+    path = export_to_path(export_dir, **payload)
+    return {'path': path, 'filename': payload['filename']}
+
+
+@job_handler('import_fixtures')
+def _import_fixtures(payload):
+    from .imports import import_fixtures
+    from .open_week import invalidate_open_week
+
+    try:
+        result = import_fixtures(payload['path'], payload['filename'], payload['season_id'])
+    finally:
+        # Imports are queued with max_attempts=1, so the upload is never read again, even after a failure.
+        if os.path.exists(payload['path']):
+            os.remove(payload['path'])
+    invalidate_open_week()
+    return result
@@ -0,0 +1,352 @@
+"""
+Overall and weekly leaderboard reads.
+
+Standings only change when scoring runs, so scoring rebuilds them into
+LeaderboardRow: one row per player per scope (0 for the overall table, else
+the match week id) with the rank, points, name and nickname already in
+place, plus the previous rank and points per week for the overall table.
+Each rebuild writes a new generation and swaps it in by moving the
+LeaderboardSnapshot pointer in the same transaction, so readers see either
+the old or the new table, never a mix. A page is then a single primary-key
+range scan on (scope, generation, position), cached in process under the
+data versions the page's ETag is built from (see app/versions.py).
+
+Reads never build a table: a scope without a snapshot yet (a fresh deploy,
+a week nobody has scored) is read from the same query the build uses, run
+live. `flask rebuild-leaderboards` builds every table up front. Signups and
+name or nickname changes patch the current overall table in the transaction
+that makes them, so they show up before the next scoring run.
+"""
+
+from datetime import datetime
+
+from sqlalchemy import select, func, delete, insert, update, literal, null, case, and_, event, inspect, type_coerce
+from sqlalchemy.orm import Session, aliased, object_session
+
+from . import db
+from .cache import TTLCache
+from .models import User, MatchWeek, MatchWeekPoint, LeaderboardSnapshot, LeaderboardRow, DataVersion
+from .sqlite import read_bind
+from .versions import GLOBAL, ALL, version_stamp
+
+OVERALL = 0
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+leaderboard_cache = TTLCache(maxsize=256, ttl=30)
+
+ROW_COLUMNS = ['match_week_id', 'generation', 'position', 'user_id', 'name', 'nickname', 'rank', 'points',
+               'previous_rank', 'week_points']
+
+
+def encode_cursor(position):
+    return str(position)
+
+
+def decode_cursor(cursor):
+    """Return the position a cursor points after, or None if it is missing or malformed."""
+    if not cursor:
+        return None
+    try:
+        return int(cursor)
+    except ValueError:
+        return None
+
+
+# ######### SNAPSHOT BUILD ########
+
+def _current_generation(scope):
+    return db.session.scalar(
+        select(LeaderboardSnapshot.generation).where(LeaderboardSnapshot.match_week_id == scope)
+    )
+
+
+def _swap(scope, generation):
+    snapshot = db.session.get(LeaderboardSnapshot, scope)
+    if snapshot is None:
+        db.session.add(LeaderboardSnapshot(match_week_id=scope, generation=generation, built_at=datetime.utcnow()))
+    else:
+        snapshot.generation = generation
+        snapshot.built_at = datetime.utcnow()
+    db.session.flush()
+    db.session.execute(delete(LeaderboardRow).where(
+        LeaderboardRow.match_week_id == scope, LeaderboardRow.generation != generation
+    ))
+
+
+def _last_scored_weeks(count):
+    return db.session.scalars(
+        select(MatchWeek.id)
+        .where(select(MatchWeekPoint.id).where(MatchWeekPoint.match_week_id == MatchWeek.id).exists())
+        .order_by(MatchWeek.predictions_close_time.desc(), MatchWeek.id.desc())
+        .limit(count)
+    ).all()
+
+
+def _overall_select(generation, reuse=None, match_week_ids=(), user_ids=()):
+    """
+    Select the overall table's rows as ``generation``. With ``reuse`` (the
+    current generation), points per week are copied from it and only
+    ``user_ids`` get the weeks in ``match_week_ids`` re-read, so a one-fixture
+    correction does not re-aggregate every player's season. Players missing
+    from it get the full aggregate.
+    """
+    total = func.coalesce(User.total_points, 0)
+    # Movement compares with the table before the last scored week, which only exists once two weeks are scored.
+    scored = _last_scored_weeks(2)
+    last_week = scored[0] if len(scored) == 2 else None
+
+    def week_points(*criteria):
+        return select(func.json_group_object(MatchWeekPoint.match_week_id, func.coalesce(MatchWeekPoint.points, 0))) \
+            .where(MatchWeekPoint.user_id == User.id, *criteria).scalar_subquery()
+
+    players = select(User.id.label('user_id'), User.name, User.nickname, total.label('points'))
+    if reuse is not None:
+        old = aliased(LeaderboardRow)
+        patched = func.json_patch(func.coalesce(old.week_points, '{}'),
+                                  week_points(MatchWeekPoint.match_week_id.in_(list(match_week_ids))))
+        players = players.add_columns(case(
+            (old.user_id.is_(None), week_points()),
+            (User.id.in_(list(user_ids)), patched),
+            else_=old.week_points
+        ).label('week_points')).outerjoin(
+            old, and_(old.match_week_id == OVERALL, old.generation == reuse, old.user_id == User.id)
+        )
+    else:
+        players = players.add_columns(week_points().label('week_points'))
+    players = players.subquery()
+
+    previous_rank = null()
+    if last_week:
+        last_points = func.coalesce(func.json_extract(players.c.week_points, f'$."{last_week}"'), 0)
+        previous_rank = func.rank().over(order_by=(players.c.points - last_points).desc())
+
+    return _labelled(
+        literal(OVERALL), literal(generation),
+        func.row_number().over(order_by=(players.c.points.desc(), players.c.user_id)),
+        players.c.user_id, players.c.name, players.c.nickname,
+        func.rank().over(order_by=players.c.points.desc()), players.c.points,
+        previous_rank, type_coerce(players.c.week_points, LeaderboardRow.week_points.type)
+    )
+
+
+def _weekly_select(match_week_id, generation):
+    rank = func.coalesce(MatchWeekPoint.rank, 0)
+    return _labelled(
+        literal(match_week_id), literal(generation),
+        func.row_number().over(order_by=(rank, User.id)),
+        User.id, User.name, User.nickname, rank, func.coalesce(MatchWeekPoint.points, 0),
+        null(), null()
+    ).join(User, MatchWeekPoint.user_id == User.id).where(MatchWeekPoint.match_week_id == match_week_id)
+
+
+def _labelled(*columns):
+    return select(*(column.label(name) for column, name in zip(columns, ROW_COLUMNS)))
+
+
+def rebuild_snapshots(match_week_ids=(), overall=True, user_ids=None):
+    """
+    Rebuild the overall table and the given match weeks' tables and swap them
+    in. Pass ``user_ids`` when only those players' points in
+    ``match_week_ids`` changed, so the overall table is patched from the
+    current one instead of recomputed. Runs in the caller's transaction; the
+    caller commits and then calls invalidate_leaderboards().
+    """
+    if overall:
+        current = _current_generation(OVERALL)
+        generation = (current or 0) + 1
+        rows = _overall_select(generation, reuse=current if user_ids is not None else None,
+                               match_week_ids=match_week_ids, user_ids=user_ids or ())
+        db.session.execute(insert(LeaderboardRow).from_select(ROW_COLUMNS, rows))
+        _swap(OVERALL, generation)
+    for match_week_id in match_week_ids:
+        generation = (_current_generation(match_week_id) or 0) + 1
+        db.session.execute(insert(LeaderboardRow).from_select(ROW_COLUMNS, _weekly_select(match_week_id, generation)))
+        _swap(match_week_id, generation)
+
+
+def rebuild_all_snapshots():
+    """Rebuild the overall table and every scored match week's table; returns how many weeks were built."""
+    match_week_ids = db.session.scalars(select(MatchWeekPoint.match_week_id).distinct()).all()
+    rebuild_snapshots(match_week_ids)
+    return len(match_week_ids)
+
+
+def _has_snapshot(scope):
+    return db.session.scalar(
+        select(LeaderboardSnapshot.match_week_id).where(LeaderboardSnapshot.match_week_id == scope),
+        bind_arguments=read_bind()
+    ) is not None
+
+
+def _rows(scope):
+    """The table of ``scope``: its current snapshot, or the build query run live if it has none yet."""
+    if _has_snapshot(scope):
+        # The generation is resolved in the same statement as the rows, so a swap between two reads
+        # cannot leave them pointing at a generation that was just deleted.
+        rows = select(LeaderboardRow).join(LeaderboardSnapshot, and_(
+            LeaderboardSnapshot.match_week_id == LeaderboardRow.match_week_id,
+            LeaderboardSnapshot.generation == LeaderboardRow.generation
+        )).where(LeaderboardRow.match_week_id == scope)
+    elif scope == OVERALL:
+        rows = _overall_select(0)
+    else:
+        rows = _weekly_select(scope, 0)
+    return rows.subquery('standings')
+
+
+# ######### READS ########
+
+def _fetch_rows(scope, after, limit, *columns):
+    rows = _rows(scope)
+    stmt = select(rows.c.position, rows.c.user_id.label('id'), rows.c.name, rows.c.nickname, rows.c.rank,
+                  *(rows.c[column] for column in columns))
+    if after is not None:
+        stmt = stmt.where(rows.c.position > after)
+    rows = db.session.execute(stmt.order_by(rows.c.position).limit(limit + 1),
+                              bind_arguments=read_bind()).mappings().all()
+    return [dict(row) for row in rows[:limit]], len(rows) > limit
+
+
+def _fetch_page(after, limit):
+    users, more = _fetch_rows(OVERALL, after, limit, 'points', 'previous_rank', 'week_points')
+    for user in users:
+        user['total_points'] = user.pop('points')
+        # Positive movement means the player climbed since the last scored week.
+        user['movement'] = user['previous_rank'] - user['rank'] if user['previous_rank'] else None
+    return {
+        'users': users,
+        'next': encode_cursor(users[-1]['position']) if more else None,
+    }
+
+
+def _fetch_weekly_page(match_week_id, after, limit):
+    scores, more = _fetch_rows(match_week_id, after, limit, 'points')
+    return {
+        'scores': scores,
+        'next': encode_cursor(scores[-1]['position']) if more else None,
+    }
+
+
+def _page_size(limit):
+    return max(1, min(limit or PAGE_SIZE, MAX_PAGE_SIZE))
+
+
+def get_leaderboard_page(cursor=None, limit=PAGE_SIZE):
+    """Return ``{'users': [...], 'next': cursor}`` for the page after ``cursor``."""
+    limit = _page_size(limit)
+    after = decode_cursor(cursor)
+    return leaderboard_cache.get_or_set(('overall', version_stamp(ALL), after, limit),
+                                        lambda: _fetch_page(after, limit))
+
+
+def get_weekly_leaderboard_page(match_week_id, cursor=None, limit=PAGE_SIZE):
+    """Return ``{'scores': [...], 'next': cursor}`` for a match week, ordered by rank."""
+    limit = _page_size(limit)
+    after = decode_cursor(cursor)
+    return leaderboard_cache.get_or_set(
+        ('weekly', match_week_id, version_stamp((GLOBAL, match_week_id)), after, limit),
+        lambda: _fetch_weekly_page(match_week_id, after, limit)
+    )
+
+
+def get_weekly_position(match_week_id, user_id):
+    """Return ``{'rank': ..., 'points': ...}`` for one player in a match week, or None."""
+    rows = _rows(match_week_id)
+    row = db.session.execute(
+        select(rows.c.rank, rows.c.points).where(rows.c.user_id == user_id),
+        bind_arguments=read_bind()
+    ).mappings().first()
+    return dict(row) if row else None
+
+
+def iter_standings(scope=OVERALL, batch_size=500):
+    """Yield (rank, name, nickname, points) for every row of a table in order, streamed in batches."""
+    rows = _rows(scope)
+    stmt = (
+        select(rows.c.rank, rows.c.name, rows.c.nickname, rows.c.points)
+        .order_by(rows.c.position)
+        .execution_options(yield_per=batch_size)
+    )
+    for row in db.session.execute(stmt, bind_arguments=read_bind()):
+        yield tuple(row)
+
+
+def invalidate_leaderboards():
+    """Drop cached standings; call after committing new points."""
+    leaderboard_cache.clear()
+
+
+# ######### ORM EVENTS ########
+
+def _remember(target, key):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(key, set()).add(target.id)
+
+
+@event.listens_for(User, 'after_insert')
+def _remember_new_player(mapper, connection, target):
+    _remember(target, 'leaderboard_new_users')
+
+
+@event.listens_for(User, 'after_update')
+def _remember_renamed_player(mapper, connection, target):
+    state = inspect(target)
+    if state.attrs.name.history.has_changes() or state.attrs.nickname.history.has_changes():
+        _remember(target, 'leaderboard_renamed_users')
+
+
+def _append_players(session, user_ids):
+    """Add new players to the bottom of the current overall table, ranked with the other players on their points."""
+    generation = session.scalar(
+        select(LeaderboardSnapshot.generation).where(LeaderboardSnapshot.match_week_id == OVERALL)
+    )
+    if generation is None:
+        return
+    table = select(LeaderboardRow).where(LeaderboardRow.match_week_id == OVERALL,
+                                         LeaderboardRow.generation == generation).subquery()
+    last_position = select(func.coalesce(func.max(table.c.position), 0)).scalar_subquery()
+    ahead = select(func.count()).where(table.c.points > func.coalesce(User.total_points, 0)).scalar_subquery()
+    session.execute(insert(LeaderboardRow).from_select(ROW_COLUMNS, _labelled(
+        literal(OVERALL), literal(generation), last_position + func.row_number().over(order_by=User.id),
+        User.id, User.name, User.nickname, ahead + 1, func.coalesce(User.total_points, 0), null(), literal('{}')
+    ).where(User.id.in_(sorted(user_ids)))))
+
+
+def _rename_players(session, user_ids):
+    player = select(User).where(User.id == LeaderboardRow.user_id)
+    session.execute(
+        update(LeaderboardRow).where(LeaderboardRow.user_id.in_(sorted(user_ids))).values(
+            name=player.with_only_columns(User.name).scalar_subquery(),
+            nickname=player.with_only_columns(User.nickname).scalar_subquery()
+        ),
+        execution_options={'synchronize_session': False}
+    )
+
+
+@event.listens_for(Session, 'after_flush')
+def _patch_players(session, flush_context):
+    new_users = session.info.pop('leaderboard_new_users', None)
+    renamed_users = session.info.pop('leaderboard_renamed_users', None)
+    if not (new_users or renamed_users):
+        return
+    if new_users:
+        _append_players(session, new_users)
+    if renamed_users and renamed_users - (new_users or set()):
+        _rename_players(session, renamed_users - (new_users or set()))
+    DataVersion.bump([GLOBAL], session)
+    session.info['data_versions_touched'] = True
+    session.info['leaderboards_patched'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_patched_leaderboards(session):
+    if session.info.pop('leaderboards_patched', False):
+        invalidate_leaderboards()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_patched_players(session):
+    for key in ('leaderboard_new_users', 'leaderboard_renamed_users', 'leaderboards_patched'):
+        session.info.pop(key, None)
@@ -0,0 +1,237 @@
+"""
+Provisional standings while matches are in progress.
+
+For the active match week every worker keeps a users x fixtures matrix of
+predicted scores and the points each prediction would currently earn. A goal
+only rescores one column (O(users)) and adjusts the running totals; ranks are
+recomputed once, lazily, for the next reader, and readers share that cached
+result.
+
+In-play scores are stored in the live_score table so that all workers converge:
+each board polls it for rows changed since its last look at most once every
+SYNC_INTERVAL seconds, so steady-state reads do no database work.
+
+A board built while predictions are still open is rebuilt when the match
+week's predictions change (checked every PREDICTION_RECHECK seconds), and
+once more after predictions_close_time, so late predictors always make it
+into the provisional standings.
+"""
+
+import threading
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import select, func
+from sqlalchemy.orm import aliased
+
+from . import db
+from .models import MatchWeek, Fixture, Team, User, LiveScore, Prediction
+from .scoring import load_match_week_predictions, score_arrays
+
+SYNC_INTERVAL = 2.0
+PREDICTION_RECHECK = 30.0
+# Submissions that arrived before the deadline can still be written for a few seconds after it
+# (see PREDICTION_ACK_TIMEOUT in app/group_commit.py).
+CLOSE_GRACE = timedelta(seconds=15)
+
+
+class LiveBoard:
+
+    def __init__(self, match_week_id, fixtures, users, frame):
+        self.match_week_id = match_week_id
+        self.fixtures = fixtures
+        self.fixture_index = {fixture['id']: j for j, fixture in enumerate(fixtures)}
+        self.user_ids = np.array([user['id'] for user in users], dtype=np.int64)
+        self.users = {user['id']: user for user in users}
+        user_index = {user_id: i for i, user_id in enumerate(self.user_ids.tolist())}
+
+        shape = (len(users), len(fixtures))
+        self.predicted_home = np.full(shape, np.nan)
+        self.predicted_away = np.full(shape, np.nan)
+        if not frame.empty:
+            rows = frame['user_id'].map(user_index).to_numpy()
+            columns = frame['fixture_id'].map(self.fixture_index).to_numpy()
+            self.predicted_home[rows, columns] = frame['home_score_prediction'].to_numpy(dtype=float)
+            self.predicted_away[rows, columns] = frame['away_score_prediction'].to_numpy(dtype=float)
+
+        self.actual_home = np.array([_nan(f['home_score']) for f in fixtures], dtype=float)
+        self.actual_away = np.array([_nan(f['away_score']) for f in fixtures], dtype=float)
+        self.points = score_arrays(self.predicted_home, self.predicted_away, self.actual_home, self.actual_away)
+        self.totals = self.points.sum(axis=1)
+
+        self.version = 0
+        self.built_at = datetime.utcnow()
+        self.prediction_stamp = None
+        self.stamp_checked_at = time.monotonic()
+        self.lock = threading.RLock()
+        self.last_seen = None
+        self.checked_at = 0.0
+        self._standings = None
+
+    def apply(self, fixture_id, home_score, away_score):
+        """Apply an in-play score; returns True if the board changed."""
+        j = self.fixture_index.get(fixture_id)
+        if j is None:
+            return False
+        home, away = _nan(home_score), _nan(away_score)
+        with self.lock:
+            if _same(self.actual_home[j], home) and _same(self.actual_away[j], away):
+                return False
+
+            self.actual_home[j], self.actual_away[j] = home, away
+            self.fixtures[j] = {**self.fixtures[j], 'home_score': home_score, 'away_score': away_score}
+            column = score_arrays(self.predicted_home[:, j], self.predicted_away[:, j], home, away)
+            self.totals += column - self.points[:, j]
+            self.points[:, j] = column
+            self.version += 1
+            self._standings = None
+            return True
+
+    def standings(self):
+        """Return the provisional table as a list of dicts, best first (cached per version)."""
+        with self.lock:
+            if self._standings is None:
+                totals = self.totals
+                ascending = np.sort(totals)
+                ranks = len(totals) - np.searchsorted(ascending, totals, side='right') + 1
+                order = np.lexsort((self.user_ids, -totals))
+                self._standings = [
+                    {
+                        'rank': int(ranks[i]),
+                        'id': int(self.user_ids[i]),
+                        'name': self.users[int(self.user_ids[i])]['name'],
+                        'nickname': self.users[int(self.user_ids[i])]['nickname'],
+                        'points': int(totals[i]),
+                    }
+                    for i in order
+                ]
+            return self._standings
+
+    def snapshot(self, limit=None, user_id=None):
+        with self.lock:
+            standings = self.standings()
+            fixtures = list(self.fixtures)
+            version = self.version
+        mine = next((row for row in standings if row['id'] == user_id), None) if user_id else None
+        return {
+            'match_week_id': self.match_week_id,
+            'version': version,
+            'fixtures': fixtures,
+            'standings': standings[:limit] if limit else standings,
+            'me': mine,
+        }
+
+
+def _nan(value):
+    return np.nan if value is None else float(value)
+
+
+def _same(a, b):
+    return (np.isnan(a) and np.isnan(b)) or a == b
+
+
+def _prediction_stamp(match_week_id):
+    return tuple(db.session.execute(
+        select(func.count(Prediction.id), func.max(Prediction.updated_at))
+        .join(Fixture, Prediction.fixture_id == Fixture.id)
+        .where(Fixture.match_week_id == match_week_id)
+    ).one())
+
+
+def _build(match_week_id):
+    # Taken before the predictions are read, so a prediction racing the build only causes another rebuild.
+    started = datetime.utcnow()
+    stamp = _prediction_stamp(match_week_id)
+    home, away = aliased(Team), aliased(Team)
+    fixtures = [
+        dict(row) for row in db.session.execute(
+            select(Fixture.id, home.name.label('home_team'), away.name.label('away_team'),
+                   Fixture.home_score, Fixture.away_score)
+            .outerjoin(home, Fixture.home_team_id == home.id)
+            .outerjoin(away, Fixture.away_team_id == away.id)
+            .where(Fixture.match_week_id == match_week_id)
+            .order_by(Fixture.id)
+        ).mappings().all()
+    ]
+    frame = load_match_week_predictions(match_week_id)
+    user_ids = sorted(int(user_id) for user_id in frame['user_id'].unique())
+    users = [
+        dict(row) for row in db.session.execute(
+            select(User.id, User.name, User.nickname).where(User.id.in_(user_ids)).order_by(User.id)
+        ).mappings().all()
+    ]
+    board = LiveBoard(match_week_id, fixtures, users, frame)
+    board.built_at, board.prediction_stamp = started, stamp
+    _sync(board)
+    return board
+
+
+def _predictions_changed(board, close_time, now):
+    """True if predictions may have been added or edited since ``board`` was built."""
+    final = close_time + CLOSE_GRACE
+    if board.built_at > final:
+        return False
+    if datetime.utcnow() > final:
+        return True
+    if now - board.stamp_checked_at < PREDICTION_RECHECK:
+        return False
+    board.stamp_checked_at = now
+    return _prediction_stamp(board.match_week_id) != board.prediction_stamp
+
+
+def _sync(board):
+    stmt = select(LiveScore.fixture_id, LiveScore.home_score, LiveScore.away_score, LiveScore.updated_at) \
+        .join(Fixture, LiveScore.fixture_id == Fixture.id) \
+        .where(Fixture.match_week_id == board.match_week_id)
+    if board.last_seen is not None:
+        # >= so rows written in the same instant as the last one seen are not missed; applying is idempotent.
+        stmt = stmt.where(LiveScore.updated_at >= board.last_seen)
+    for fixture_id, home_score, away_score, updated_at in db.session.execute(stmt).all():
+        board.apply(fixture_id, home_score, away_score)
+        board.last_seen = max(board.last_seen or updated_at, updated_at)
+
+
+_board = None
+_lock = threading.Lock()
+
+
+def get_live_board():
+    """Return the LiveBoard for the active match week, or None if no match week is active."""
+    global _board
+    with _lock:
+        now = time.monotonic()
+        if _board is not None and now - _board.checked_at < SYNC_INTERVAL:
+            return _board
+
+        active = db.session.execute(
+            select(MatchWeek.id, MatchWeek.predictions_close_time).where(MatchWeek.is_active.is_(True))
+        ).first()
+        if active is None:
+            _board = None
+            return None
+        if _board is None or _board.match_week_id != active.id \
+                or _predictions_changed(_board, active.predictions_close_time, now):
+            _board = _build(active.id)
+        else:
+            _sync(_board)
+        _board.checked_at = now
+        return _board
+
+
+def apply_live_scores(rows):
+    """
+    Apply just-committed in-play scores (``{'fixture_id', 'home_score',
+    'away_score'}`` dicts, as passed to LiveScore.record) to this worker's
+    board. Other workers pick them up on their next sync.
+    """
+    with _lock:
+        if _board is not None:
+            for row in rows:
+                _board.apply(row['fixture_id'], row['home_score'], row['away_score'])
+
+
+def reset_live_board():
+    global _board
+    with _lock:
+        _board = None
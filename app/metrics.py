@@ -0,0 +1,281 @@
+"""
+Request-level SQL and timing instrumentation.
+
+Every request records its SQL statement count and time (through SQLAlchemy
+cursor events), the time spent rendering Jinja templates and the total view
+time. In debug mode (or with METRICS_HEADERS) these are sent back as
+Server-Timing / X-Query-Count headers, and every request is folded into
+per-endpoint histograms served by /admin/metrics.
+
+query_budget() counts the statements issued inside a block, whether from a
+view driven by the test client or plain code, and raises QueryBudgetExceeded
+if there were more than allowed:
+
+    with query_budget(5):
+        client.get('/leaderboard')
+"""
+
+import bisect
+import heapq
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import g, has_request_context, request, before_render_template, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+SLOW_STATEMENT_LENGTH = 300
+
+# Bucket upper bounds: milliseconds growing by ~25% from 0.25ms to ~2 minutes, and exact query counts
+# up to 100.
+TIME_BUCKETS = [round(0.25 * 1.25 ** i, 3) for i in range(60)]
+COUNT_BUCKETS = list(range(101)) + [150, 200, 300, 500, 1000, 2000, 5000, 10000]
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class Recorder:
+    """SQL counters for one request or query_budget() block."""
+
+    def __init__(self, keep_slowest=0):
+        self.count = 0
+        self.sql_time = 0.0
+        self.keep_slowest = keep_slowest
+        self.slowest = []
+
+    def record(self, statement, duration):
+        self.count += 1
+        self.sql_time += duration
+        if self.keep_slowest:
+            item = (duration, statement[:SLOW_STATEMENT_LENGTH])
+            if len(self.slowest) < self.keep_slowest:
+                heapq.heappush(self.slowest, item)
+            elif item > self.slowest[0]:
+                heapq.heapreplace(self.slowest, item)
+
+
+class Histogram:
+
+    def __init__(self, buckets=TIME_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def add(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the given fraction of observations."""
+        if not self.total:
+            return None
+        threshold = fraction * self.total
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= threshold:
+                return round(min(self.buckets[i], self.max) if i < len(self.buckets) else self.max, 3)
+        return round(self.max, 3)
+
+    def to_dict(self):
+        return {
+            'count': self.total,
+            'mean': round(self.sum / self.total, 3) if self.total else None,
+            'p50': self.percentile(0.50),
+            'p95': self.percentile(0.95),
+            'p99': self.percentile(0.99),
+            'max': round(self.max, 3),
+        }
+
+
+class EndpointStats:
+
+    def __init__(self):
+        self.duration = Histogram()
+        self.sql_time = Histogram()
+        self.render_time = Histogram()
+        self.queries = Histogram(COUNT_BUCKETS)
+        self.slowest = []
+
+    def add(self, duration, recorder, render_time, keep_slowest):
+        self.duration.add(duration)
+        self.sql_time.add(recorder.sql_time * 1000)
+        self.render_time.add(render_time)
+        self.queries.add(recorder.count)
+        for seconds, statement in recorder.slowest:
+            item = (round(seconds * 1000, 3), statement)
+            if len(self.slowest) < keep_slowest:
+                heapq.heappush(self.slowest, item)
+            elif item > self.slowest[0]:
+                heapq.heapreplace(self.slowest, item)
+
+    def to_dict(self):
+        return {
+            'duration_ms': self.duration.to_dict(),
+            'sql_ms': self.sql_time.to_dict(),
+            'render_ms': self.render_time.to_dict(),
+            'queries': self.queries.to_dict(),
+            'slowest_statements': [
+                {'ms': ms, 'statement': statement} for ms, statement in sorted(self.slowest, reverse=True)
+            ],
+        }
+
+
+_local = threading.local()
+
+
+def _active_recorders():
+    recorders = getattr(_local, 'recorders', None)
+    if recorders is None:
+        recorders = _local.recorders = []
+    return recorders
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _active_recorders():
+        conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    recorders = _active_recorders()
+    if not recorders:
+        return
+    starts = conn.info.get('query_start')
+    if not starts:
+        return
+    duration = time.perf_counter() - starts.pop()
+    for recorder in recorders:
+        recorder.record(statement, duration)
+
+
+def _handle_error(context):
+    # after_cursor_execute is not called for a statement that raised; drop its start time.
+    connection = context.connection
+    if connection is not None:
+        starts = connection.info.get('query_start')
+        if starts:
+            starts.pop()
+
+
+_listening = False
+_listen_lock = threading.Lock()
+
+
+def _listen():
+    global _listening
+    with _listen_lock:
+        if not _listening:
+            event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+            event.listen(Engine, 'handle_error', _handle_error)
+            _listening = True
+
+
+@contextmanager
+def query_budget(max_queries):
+    """Fail with QueryBudgetExceeded if the block issues more than ``max_queries`` statements."""
+    _listen()
+    recorder = Recorder()
+    recorders = _active_recorders()
+    recorders.append(recorder)
+    try:
+        yield recorder
+    finally:
+        recorders.remove(recorder)
+    if recorder.count > max_queries:
+        raise QueryBudgetExceeded(f'{recorder.count} queries issued, budget was {max_queries}')
+
+
+class Metrics:
+
+    def __init__(self, app=None):
+        self.app = None
+        self._lock = threading.Lock()
+        self._endpoints = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('METRICS_ENABLED', True)
+        # None follows app.debug, which app.run(debug=True) only sets after create_app().
+        app.config.setdefault('METRICS_HEADERS', None)
+        app.config.setdefault('METRICS_SLOW_STATEMENTS', 5)
+        app.extensions['metrics'] = self
+        self.app = app
+        if not app.config['METRICS_ENABLED']:
+            return
+
+        _listen()
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        before_render_template.connect(self._before_render, app)
+        template_rendered.connect(self._after_render, app)
+
+    def _before_request(self):
+        g.metrics_start = time.perf_counter()
+        g.metrics_render = 0.0
+        g.metrics_render_stack = []
+        g.metrics_recorder = Recorder(keep_slowest=self.app.config['METRICS_SLOW_STATEMENTS'])
+        _active_recorders().append(g.metrics_recorder)
+
+    def _before_render(self, sender, template, context, **extra):
+        if has_request_context() and 'metrics_render_stack' in g:
+            g.metrics_render_stack.append(time.perf_counter())
+
+    def _after_render(self, sender, template, context, **extra):
+        if has_request_context() and g.get('metrics_render_stack'):
+            started = g.metrics_render_stack.pop()
+            # Only the outermost template counts; nested render_template calls are already inside it.
+            if not g.metrics_render_stack:
+                g.metrics_render += time.perf_counter() - started
+
+    def _after_request(self, response):
+        recorder = g.get('metrics_recorder')
+        if recorder is None:
+            return response
+        duration = (time.perf_counter() - g.metrics_start) * 1000
+        render_time = g.metrics_render * 1000
+        sql_time = recorder.sql_time * 1000
+
+        # Streamed responses (exports, /events) are timed up to the first byte only.
+        endpoint = request.endpoint or 'unmatched'
+        with self._lock:
+            stats = self._endpoints.get(endpoint)
+            if stats is None:
+                stats = self._endpoints[endpoint] = EndpointStats()
+            stats.add(duration, recorder, render_time, self.app.config['METRICS_SLOW_STATEMENTS'])
+
+        show_headers = self.app.config['METRICS_HEADERS']
+        if show_headers or (show_headers is None and self.app.debug):
+            response.headers['X-Query-Count'] = str(recorder.count)
+            response.headers['Server-Timing'] = ', '.join([
+                f'sql;dur={sql_time:.2f};desc="{recorder.count} queries"',
+                f'render;dur={render_time:.2f}',
+                f'view;dur={duration:.2f}',
+            ])
+        return response
+
+    def _teardown_request(self, exc):
+        recorder = g.pop('metrics_recorder', None)
+        recorders = _active_recorders()
+        if recorder is not None and recorder in recorders:
+            recorders.remove(recorder)
+
+    def snapshot(self):
+        with self._lock:
+            return {endpoint: stats.to_dict() for endpoint, stats in sorted(self._endpoints.items())}
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+
+
+metrics = Metrics()
@@ -1,6 +1,7 @@
 from flask_login import UserMixin
 from datetime import datetime
-from sqlalchemy import func
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from . import db
 
 # Association tables (many-to-many)
@@ -27,6 +28,9 @@ class User(UserMixin, db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     total_points = db.Column(db.Integer, nullable=False, default=0)
 
+    # Matches the leaderboard order (total_points DESC, id) so keyset pages are plain index range scans.
+    __table_args__ = (db.Index('ix_user_total_points', total_points.desc(), id),)
+
     predictions = db.relationship('Prediction', backref='user', lazy=True, cascade="all, delete-orphan", passive_deletes=True)
     match_week_scores = db.relationship('MatchWeekPoint', backref='user', lazy=True, cascade="all, delete-orphan", passive_deletes=True)
 
@@ -49,6 +53,15 @@ class Week(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     week_number = db.Column(db.Integer, nullable=False)
 
+    @classmethod
+    def seed(cls, count=38):
+        """Add the missing weeks 1..``count`` in the current transaction and return how many were added."""
+        existing = set(db.session.scalars(select(cls.week_number)).all())
+        missing = [number for number in range(1, count + 1) if number not in existing]
+        if missing:
+            db.session.add_all([cls(week_number=number) for number in missing])
+        return len(missing)
+
     def __repr__(self):
         return f'<Week {self.week_number}>'
 
@@ -78,7 +91,7 @@ class MatchWeek(db.Model):
 
 class Fixture(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    match_week_id = db.Column(db.Integer, db.ForeignKey('match_week.id', ondelete="CASCADE"), nullable=False)
+    match_week_id = db.Column(db.Integer, db.ForeignKey('match_week.id', ondelete="CASCADE"), nullable=False, index=True)
     home_team_id = db.Column(db.Integer, db.ForeignKey('team.id', ondelete="SET NULL"), nullable=True)
     away_team_id = db.Column(db.Integer, db.ForeignKey('team.id', ondelete="SET NULL"), nullable=True)
 
@@ -121,6 +134,36 @@ class Prediction(db.Model):
     home_team = db.relationship('Team', foreign_keys=[home_team_id], backref='home_predictions', passive_deletes=True)
     away_team = db.relationship('Team', foreign_keys=[away_team_id], backref='away_predictions', passive_deletes=True)
 
+    __table_args__ = (
+        db.Index('ix_prediction_user_fixture', user_id, fixture_id, unique=True),
+        db.Index('ix_prediction_fixture_id', fixture_id),
+    )
+
+    @classmethod
+    def upsert(cls, rows):
+        """
+        Insert or update predictions keyed on (user_id, fixture_id).
+
+        ``rows`` are dicts with user_id, fixture_id, the team ids and both score
+        predictions. All rows go through one executemany INSERT ... ON CONFLICT,
+        so concurrent double-submits can never create duplicates.
+        """
+        if not rows:
+            return
+        now = datetime.utcnow()
+        stmt = sqlite_insert(cls.__table__)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[cls.user_id, cls.fixture_id],
+            set_={
+                'home_team_id': stmt.excluded.home_team_id,
+                'away_team_id': stmt.excluded.away_team_id,
+                'home_score_prediction': stmt.excluded.home_score_prediction,
+                'away_score_prediction': stmt.excluded.away_score_prediction,
+                'updated_at': stmt.excluded.updated_at,
+            }
+        )
+        db.session.execute(stmt, [{'created_at': now, 'updated_at': now, **row} for row in rows])
+
 
 class Team(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -146,15 +189,185 @@ class MatchWeekPoint(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index('ix_match_week_point_user_week', user_id, match_week_id, unique=True),
+        db.Index('ix_match_week_point_week_points', match_week_id, points),
+    )
+
+    @classmethod
+    def add_points(cls, rows):
+        """
+        Add ``points`` to each (user_id, match_week_id) row, creating missing rows.
+
+        Runs as one executemany INSERT ... ON CONFLICT DO UPDATE against the
+        unique (user_id, match_week_id) index.
+        """
+        if not rows:
+            return
+        now = datetime.utcnow()
+        stmt = sqlite_insert(cls.__table__)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[cls.user_id, cls.match_week_id],
+            set_={
+                'points': func.coalesce(cls.__table__.c.points, 0) + stmt.excluded.points,
+                'updated_at': stmt.excluded.updated_at,
+            }
+        )
+        db.session.execute(stmt, [{'created_at': now, 'updated_at': now, **row} for row in rows])
+
     def rank_user(self):
-        scores = MatchWeekPoint.query.filter_by(match_week_id=self.match_week_id) \
-            .order_by(MatchWeekPoint.points.desc()).all()
-        rank = 1
-        for score in scores:
-            if score.user_id == self.user_id:
-                self.rank = rank
-                break
-            rank += 1
+        # Competition ranking: one more than the number of players who scored strictly more.
+        ahead = db.session.scalar(
+            select(func.count(MatchWeekPoint.id)).where(
+                MatchWeekPoint.match_week_id == self.match_week_id,
+                func.coalesce(MatchWeekPoint.points, 0) > (self.points or 0)
+            )
+        )
+        self.rank = ahead + 1
+
+    @classmethod
+    def rank_match_week(cls, match_week_id):
+        """Assign RANK() by points to every score of a match week with a single UPDATE ... FROM."""
+        ranked = select(
+            cls.id,
+            func.rank().over(order_by=func.coalesce(cls.points, 0).desc()).label('position')
+        ).where(cls.match_week_id == match_week_id).subquery()
+
+        db.session.execute(
+            update(cls).where(cls.id == ranked.c.id).values(rank=ranked.c.position),
+            execution_options={'synchronize_session': False}
+        )
+
+    @classmethod
+    def season_standings(cls, season_id):
+        """Return (user_id, points, rank) rows for a season, ranked by summed match week points."""
+        totals = select(
+            cls.user_id,
+            func.coalesce(func.sum(cls.points), 0).label('points')
+        ).join(MatchWeek, cls.match_week_id == MatchWeek.id) \
+            .where(MatchWeek.season_id == season_id) \
+            .group_by(cls.user_id).subquery()
+
+        position = func.rank().over(order_by=totals.c.points.desc()).label('rank')
+        stmt = select(totals.c.user_id, totals.c.points, position).order_by(position, totals.c.user_id)
+        return db.session.execute(stmt).all()
 
     def __repr__(self):
         return f'<MatchWeekPoint User {self.user_id} Week {self.match_week_id} Points {self.points}>'
+
+
+class LeaderboardSnapshot(db.Model):
+    """Current generation of the precomputed standings of one scope (0 = overall, else a match week id)."""
+    match_week_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    generation = db.Column(db.Integer, nullable=False)
+    built_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f'<LeaderboardSnapshot {self.match_week_id} generation {self.generation}>'
+
+
+class LeaderboardRow(db.Model):
+    """One precomputed standings row; rows of older generations are deleted when a new one is swapped in."""
+    match_week_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    generation = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    position = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    user_id = db.Column(db.Integer, nullable=False)
+    name = db.Column(db.String(100), nullable=False)
+    nickname = db.Column(db.String(100), nullable=False)
+    rank = db.Column(db.Integer, nullable=False)
+    points = db.Column(db.Integer, nullable=False)
+    previous_rank = db.Column(db.Integer, nullable=True)
+    week_points = db.Column(db.JSON, nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_leaderboard_row_user', match_week_id, generation, user_id),
+    )
+
+    def __repr__(self):
+        return f'<LeaderboardRow {self.match_week_id} #{self.rank} User {self.user_id}>'
+
+
+class Job(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    payload = db.Column(db.JSON, nullable=True)
+    status = db.Column(db.String(20), nullable=False, default='queued', index=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    result = db.Column(db.JSON, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    created_by_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete="SET NULL"), nullable=True)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    @property
+    def is_finished(self):
+        return self.status in ('done', 'failed')
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'attempts': self.attempts,
+            'result': self.result,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+    def __repr__(self):
+        return f'<Job {self.id} {self.kind} {self.status}>'
+
+
+class LiveScore(db.Model):
+    """In-play score of a fixture, shared by every worker's provisional standings."""
+    fixture_id = db.Column(db.Integer, db.ForeignKey('fixture.id', ondelete="CASCADE"), primary_key=True)
+    home_score = db.Column(db.Integer, nullable=True)
+    away_score = db.Column(db.Integer, nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+    @classmethod
+    def record(cls, rows):
+        """Upsert ``{'fixture_id', 'home_score', 'away_score'}`` rows with one executemany statement."""
+        if not rows:
+            return
+        now = datetime.utcnow()
+        stmt = sqlite_insert(cls.__table__)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[cls.fixture_id],
+            set_={
+                'home_score': stmt.excluded.home_score,
+                'away_score': stmt.excluded.away_score,
+                'updated_at': stmt.excluded.updated_at,
+            }
+        )
+        db.session.execute(stmt, [{'updated_at': now, **row} for row in rows])
+
+    def __repr__(self):
+        return f'<LiveScore Fixture {self.fixture_id} {self.home_score}-{self.away_score}>'
+
+
+class DataVersion(db.Model):
+    """Write counter of one scope (0 = data every page shows, else a match week id), used for ETags."""
+    scope = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    @classmethod
+    def bump(cls, scopes, session=None):
+        """Increment the counters of ``scopes`` in the current transaction with one executemany upsert."""
+        if not scopes:
+            return
+        now = datetime.utcnow()
+        stmt = sqlite_insert(cls.__table__)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[cls.scope],
+            set_={'version': cls.__table__.c.version + 1, 'updated_at': stmt.excluded.updated_at}
+        )
+        (session or db.session).execute(stmt, [{'scope': scope, 'version': 1, 'updated_at': now} for scope in scopes])
+
+    def __repr__(self):
+        return f'<DataVersion {self.scope} v{self.version}>'
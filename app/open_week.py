@@ -0,0 +1,111 @@
+"""
+Process-wide snapshot of the match weeks that are currently open or upcoming.
+
+The answer only changes when an admin edits a match week or its fixtures or
+when a prediction window opens or closes, so the snapshot is cached until the
+next predictions_open_time/predictions_close_time boundary (capped at MAX_TTL)
+and reloaded as soon as the data versions of the shared data or of one of its
+match weeks move, in every worker, at the same moment the pages' ETags do.
+"""
+
+from collections import namedtuple
+from datetime import datetime
+
+from sqlalchemy import select
+from sqlalchemy.orm import aliased
+
+from . import db
+from .cache import TTLCache
+from .models import MatchWeek, Fixture, Week, Team
+from .versions import GLOBAL, get_versions, version_stamp
+
+MAX_TTL = 300
+
+open_week_cache = TTLCache(maxsize=1, ttl=MAX_TTL)
+
+
+class OpenMatchWeek(namedtuple('OpenMatchWeek', [
+        'id', 'season_id', 'week_number', 'predictions_open_time', 'predictions_close_time'])):
+    __slots__ = ()
+
+    @property
+    def is_predictions_open(self):
+        return self.predictions_open_at(datetime.utcnow())
+
+    def predictions_open_at(self, when):
+        return self.predictions_open_time <= when <= self.predictions_close_time
+
+
+OpenFixture = namedtuple('OpenFixture', [
+    'id', 'match_week_id', 'home_team_id', 'away_team_id', 'home_team_name', 'away_team_name'
+])
+
+Snapshot = namedtuple('Snapshot', ['active_match_weeks', 'open_match_week', 'fixtures'])
+
+
+def _load_snapshot(now):
+    active_match_weeks = [
+        OpenMatchWeek(*row) for row in db.session.execute(
+            select(MatchWeek.id, MatchWeek.season_id, Week.week_number,
+                   MatchWeek.predictions_open_time, MatchWeek.predictions_close_time)
+            .join(Week, MatchWeek.week_id == Week.id)
+            .where(MatchWeek.predictions_close_time > now)
+            .order_by(MatchWeek.predictions_close_time, MatchWeek.id)
+        ).all()
+    ]
+    open_weeks = [mw for mw in active_match_weeks if mw.predictions_open_time <= now]
+
+    fixtures = []
+    if open_weeks:
+        home, away = aliased(Team), aliased(Team)
+        fixtures = [
+            OpenFixture(*row) for row in db.session.execute(
+                select(Fixture.id, Fixture.match_week_id, Fixture.home_team_id, Fixture.away_team_id,
+                       home.name, away.name)
+                .outerjoin(home, Fixture.home_team_id == home.id)
+                .outerjoin(away, Fixture.away_team_id == away.id)
+                .where(Fixture.match_week_id.in_([mw.id for mw in open_weeks]))
+                .order_by(Fixture.id)
+            ).all()
+        ]
+
+    # Predictions are taken for one match week at a time: the first one to close that has fixtures.
+    weeks_with_fixtures = {fixture.match_week_id for fixture in fixtures}
+    open_match_week = next((mw for mw in open_weeks if mw.id in weeks_with_fixtures), None)
+    if open_match_week:
+        fixtures = [fixture for fixture in fixtures if fixture.match_week_id == open_match_week.id]
+
+    snapshot = Snapshot(tuple(active_match_weeks), open_match_week, tuple(fixtures))
+
+    boundaries = [
+        moment for mw in active_match_weeks
+        for moment in (mw.predictions_open_time, mw.predictions_close_time) if moment > now
+    ]
+    ttl = MAX_TTL
+    if boundaries:
+        ttl = max(0, min(ttl, (min(boundaries) - now).total_seconds()))
+    return snapshot, ttl
+
+
+def get_open_snapshot():
+    """
+    Return a Snapshot of the upcoming match weeks, the match week open for
+    predictions (or None) and its fixtures with team names resolved.
+    """
+    entry = open_week_cache.get('snapshot')
+    if entry is not None and entry[1] == _stamp(entry[0]):
+        return entry[0]
+    # Stamped with the versions read before loading, so a write racing the load only causes a reload.
+    versions = get_versions()
+    snapshot, ttl = _load_snapshot(datetime.utcnow())
+    open_week_cache.set('snapshot', (snapshot, _stamp(snapshot, versions)), ttl)
+    return snapshot
+
+
+def _stamp(snapshot, versions=None):
+    return version_stamp((GLOBAL, *(mw.id for mw in snapshot.active_match_weeks)), versions)
+
+
+def invalidate_open_week():
+    """Drop the cached snapshot; call after committing match week or fixture changes."""
+    open_week_cache.clear()
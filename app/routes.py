@@ -1,17 +1,28 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session, jsonify, abort, send_file, \
-    make_response
+    make_response, current_app, Response
 from flask_login import login_user, login_required, logout_user, current_user
 from datetime import date, datetime, timedelta
+from sqlalchemy import func, select, update
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import joinedload
 from .models import *
 from .forms import *
 from wtforms import FieldList, FormField
 from . import oauth
+from .leaderboard import get_leaderboard_page, get_weekly_leaderboard_page, get_weekly_position, \
+    invalidate_leaderboards, PAGE_SIZE, MAX_PAGE_SIZE
+from .open_week import get_open_snapshot, invalidate_open_week
+from .teams import get_teams, refresh_teams
+from .jobs import enqueue
+from .events import event_publisher
+from .metrics import metrics
+from .group_commit import prediction_writer
+from .versions import GLOBAL, ALL, conditional, touch
+from .fragments import cached_fragments
 import os
 import io
+import tempfile
 from pprint import pprint
-import pandas as pd
-from fpdf import FPDF
 
 bp = Blueprint('main', __name__)
 
@@ -60,11 +71,15 @@ def test_error():
 
 
 
+def _open_windows():
+    return tuple((mw.id, mw.is_predictions_open) for mw in get_open_snapshot().active_match_weeks)
+
+
 @bp.route('/')
+@conditional(lambda: (GLOBAL,), extra=_open_windows)
 def index():
     try:
-        now = datetime.utcnow()
-        active_match_weeks = MatchWeek.query.filter(MatchWeek.predictions_close_time > now).all()
+        active_match_weeks = get_open_snapshot().active_match_weeks
         return render_template('index.html', active_match_weeks=active_match_weeks)
     except SQLAlchemyError as e:
         flash(f'Database error: {str(e)}', 'error')
@@ -178,6 +193,18 @@ def logout():
     return redirect(url_for('main.index'))
 
 
+def _render_fixture_lists(match_weeks, match_week_ids):
+    fixtures = {match_week_id: [] for match_week_id in match_week_ids}
+    for fixture in Fixture.query.options(joinedload(Fixture.home_team), joinedload(Fixture.away_team)) \
+            .filter(Fixture.match_week_id.in_(match_week_ids)).order_by(Fixture.id):
+        fixtures[fixture.match_week_id].append(fixture)
+    return {
+        match_week.id: render_template('admin/_fixture_list.html', match_week=match_week,
+                                       fixtures=fixtures[match_week.id])
+        for match_week in match_weeks if match_week.id in fixtures
+    }
+
+
 @bp.route('/admin')
 @login_required
 def admin_dashboard():
@@ -187,11 +214,22 @@ def admin_dashboard():
     try:
         now = datetime.utcnow()
         users = User.query.order_by(User.id).all()
-        match_weeks = MatchWeek.query.order_by(MatchWeek.id).all()
+        # Eager-load everything the template touches so the page costs a fixed number of queries.
+        match_weeks = MatchWeek.query.options(
+            joinedload(MatchWeek.week),
+            joinedload(MatchWeek.season)
+        ).order_by(MatchWeek.id).all()
+        # Fixture lists are the same for every admin; only weeks whose cached list is stale are loaded.
+        fixture_lists = cached_fragments('dashboard-fixtures', [mw.id for mw in match_weeks],
+                                         lambda ids: _render_fixture_lists(match_weeks, ids))
+        fixture_counts = dict(
+            db.session.query(Fixture.match_week_id, func.count(Fixture.id)).group_by(Fixture.match_week_id).all()
+        )
         seasons = Season.query.order_by(Season.id).all()
-        teams = Team.query.order_by(Team.id).all()
+        teams = sorted(get_teams().teams, key=lambda team: team.id)
         return render_template('admin/dashboard.html', title='Admin Panel', now=now,
-                               users=users, match_weeks=match_weeks, seasons=seasons, teams=teams)
+                               users=users, match_weeks=match_weeks, fixture_counts=fixture_counts,
+                               fixture_lists=fixture_lists, seasons=seasons, teams=teams)
     except SQLAlchemyError as e:
         flash(f'Database error: {str(e)}', 'error')
         return redirect(url_for('main.index'))
@@ -204,13 +242,7 @@ def create_weeks():
         flash('Access denied. Admin privileges required.', 'error')
         return redirect(url_for('main.index'))
     try:
-        weeks_to_create = []
-        for week_num in range(1, 39):
-            if not Week.query.filter_by(week_number=week_num).first():
-                weeks_to_create.append(Week(week_number=week_num))
-
-        if weeks_to_create:
-            db.session.add_all(weeks_to_create)
+        if Week.seed():
             db.session.commit()
             flash('Weeks created successfully!', 'success')
         else:
@@ -232,15 +264,17 @@ def populate_teams():
 
     populated_count = 0
     try:
+        teams = get_teams()
         for team_dict in EPL_TEAMS:
             for short_name, name in team_dict.items():
-                if not Team.query.filter_by(name=name.strip()).first():
+                if not teams.lookup(name):
                     new_team = Team(name=name.strip(), short_name=short_name.strip())
                     db.session.add(new_team)
                     populated_count += 1
 
         db.session.commit()
         if populated_count > 0:
+            refresh_teams()
             flash(f'{populated_count} teams populated successfully!', 'success')
         else:
             flash('All teams already exist. No new teams were added.', 'info')
@@ -269,6 +303,7 @@ def edit_team(team_id):
             form.populate_obj(team)
             team.updated_at = datetime.utcnow()
             db.session.commit()
+            refresh_teams()
             flash('Team Updated.', 'success')
             return redirect(url_for('main.admin_dashboard'))
         except SQLAlchemyError as e:
@@ -299,7 +334,7 @@ def create_match_week():
     try:
         weeks_db = Week.query.order_by(Week.id).all()
         seasons_db = Season.query.order_by(Season.season_start_year.asc()).all()
-        teams_db = Team.query.order_by(Team.name).all()
+        teams_db = get_teams().teams
 
         if not weeks_db or not seasons_db or not teams_db:
             flash('Required database tables (Weeks, Seasons, or Teams) are empty. Please populate them first.', 'error')
@@ -347,6 +382,7 @@ def create_match_week():
                     fixture_count += 1
 
             db.session.commit()
+            invalidate_open_week()
             flash(f'Match Week created successfully with {fixture_count} fixtures!', 'success')
             return redirect(url_for('main.admin_dashboard'))
         except SQLAlchemyError as e:
@@ -362,6 +398,40 @@ def create_match_week():
     return render_template('admin/create_match_week.html', form=form)
 
 
+@bp.route('/admin/import_fixtures', methods=['POST'])
+@login_required
+def import_fixtures():
+    if not current_user.is_admin:
+        return jsonify({'success': False, 'error': 'Admin privileges required.'}), 403
+
+    upload = request.files.get('file')
+    season_id = request.form.get('season_id', type=int)
+    if not upload or not upload.filename:
+        return jsonify({'success': False, 'error': 'No file uploaded.'}), 400
+    extension = os.path.splitext(upload.filename)[1].lower()
+    if extension not in ('.csv', '.xlsx', '.xlsm'):
+        return jsonify({'success': False, 'error': 'Upload a .csv or .xlsx file.'}), 400
+    if not season_id:
+        return jsonify({'success': False, 'error': 'Select a season.'}), 400
+
+    upload_dir = current_app.config['UPLOAD_DIR']
+    os.makedirs(upload_dir, exist_ok=True)
+    fd, path = tempfile.mkstemp(dir=upload_dir, prefix='fixtures-', suffix=extension)
+    with os.fdopen(fd, 'wb') as handle:
+        upload.save(handle)
+
+    try:
+        job = enqueue('import_fixtures', {'path': path, 'filename': upload.filename, 'season_id': season_id},
+                      user_id=current_user.id, max_attempts=1)
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        os.remove(path)
+        return jsonify({'success': False, 'error': f'Database error: {str(e)}'}), 500
+
+    return jsonify({'success': True, 'job_id': job.id,
+                    'status_url': url_for('main.job_status', job_id=job.id, format='json')}), 202
+
+
 @bp.route('/admin/edit_match_week/<int:match_week_id>', methods=['GET', 'POST'])
 @login_required
 def edit_match_week(match_week_id):
@@ -392,6 +462,7 @@ def edit_match_week(match_week_id):
             match_week.predictions_open_time = form.predictions_open_time.data
             match_week.predictions_close_time = form.predictions_close_time.data
             db.session.commit()
+            invalidate_open_week()
             flash('Match week updated.', 'success')
             return redirect(url_for('main.admin_dashboard'))
         except (ValueError, SQLAlchemyError) as e:
@@ -433,10 +504,14 @@ def create_season():
 
 
 @bp.route('/print-fixtures/<int:match_week_id>')
+@conditional(lambda match_week_id: (GLOBAL, match_week_id))
 def print_fixtures(match_week_id):
     try:
-        match_week = MatchWeek.query.get_or_404(match_week_id)
-        return render_template('print_fixtures.html', week=match_week)
+        match_week = MatchWeek.query.options(joinedload(MatchWeek.week)).get_or_404(match_week_id)
+        # Only called by the template when its cached fixtures table is missing or stale.
+        load_fixtures = Fixture.query.options(joinedload(Fixture.home_team), joinedload(Fixture.away_team)) \
+            .filter_by(match_week_id=match_week.id).order_by(Fixture.id).all
+        return render_template('print_fixtures.html', week=match_week, load_fixtures=load_fixtures)
     except SQLAlchemyError:
         abort(500)
 
@@ -453,6 +528,7 @@ def activate_match_week(week_id):
         match_week = MatchWeek.query.get_or_404(week_id)
         match_week.is_active = True
         db.session.commit()
+        invalidate_open_week()
         flash(f'Match Week {match_week.week.week_number} activated!', 'success')
     except SQLAlchemyError as e:
         db.session.rollback()
@@ -461,24 +537,461 @@ def activate_match_week(week_id):
     return redirect(url_for('main.admin_dashboard'))
 
 
-@bp.route('/matches', methods=['GET', 'POST'])
+@bp.route('/admin/generate_matchweek_points/<int:match_week_id>', methods=['GET', 'POST'])
 @login_required
-def predict():
+def generate_matchweek_points(match_week_id):
+    if not current_user.is_admin:
+        flash('Access denied. Admin privileges required.', 'error')
+        return redirect(url_for('main.index'))
+
     try:
-        open_fixtures = Fixture.get_open_for_predictions()
+        match_week = MatchWeek.query.get_or_404(match_week_id)
+        job = enqueue('score_match_week', {'match_week_id': match_week.id}, user_id=current_user.id)
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        flash(f'Error queueing points calculation: {str(e)}', 'error')
+        return redirect(url_for('main.admin_dashboard'))
+
+    flash(f'Points calculation for Match Week {match_week.week.week_number} queued.', 'info')
+    return redirect(url_for('main.job_status', job_id=job.id))
+
+
+@bp.route('/admin/jobs/<int:job_id>')
+@login_required
+def job_status(job_id):
+    if not current_user.is_admin:
+        flash('Access denied. Admin privileges required.', 'error')
+        return redirect(url_for('main.index'))
+
+    try:
+        job = Job.query.get_or_404(job_id)
+    except SQLAlchemyError:
+        abort(500)
+
+    if request.args.get('format') == 'json' or request.accept_mimetypes.best == 'application/json':
+        return jsonify(job.to_dict())
+    return render_template('admin/job.html', title=f'Job {job.id}', job=job)
+
+
+@bp.route('/admin/jobs/<int:job_id>/download')
+@login_required
+def download_job_result(job_id):
+    if not current_user.is_admin:
+        flash('Access denied. Admin privileges required.', 'error')
+        return redirect(url_for('main.index'))
+
+    try:
+        job = Job.query.get_or_404(job_id)
+    except SQLAlchemyError:
+        abort(500)
+
+    if job.status != 'done' or not (job.result or {}).get('path'):
+        abort(404)
+    if not os.path.exists(job.result['path']):
+        flash('This export has expired. Please export it again.', 'warning')
+        return redirect(url_for('main.job_status', job_id=job.id))
+    return send_file(job.result['path'], as_attachment=True, download_name=job.result['filename'])
+
+
+@bp.route('/admin/metrics')
+@login_required
+def admin_metrics():
+    if not current_user.is_admin:
+        return jsonify({'error': 'Access denied. Admin privileges required.'}), 403
+    return jsonify(metrics.snapshot())
+
+
+@bp.route('/leaderboard')
+@login_required
+@conditional(lambda: ALL)
+def leaderboard():
+    limit = request.args.get('limit', PAGE_SIZE, type=int)
+    try:
+        page = get_leaderboard_page(request.args.get('after'), limit)
     except SQLAlchemyError as e:
         flash(f'Database error: {str(e)}', 'error')
         return redirect(url_for('main.index'))
+    # A custom page size is carried into the Next link; the default keeps the URL clean.
+    return render_template('leaderboard.html', users=page['users'], next_cursor=page['next'],
+                           limit=limit if limit != PAGE_SIZE else None)
 
-    if not open_fixtures:
-        flash("Predictions not open at the moment", 'info')
+
+@bp.route('/api/leaderboard')
+@login_required
+@conditional(lambda: ALL)
+def api_leaderboard():
+    try:
+        page = get_leaderboard_page(request.args.get('after'), request.args.get('limit', PAGE_SIZE, type=int))
+    except SQLAlchemyError:
+        return jsonify({'error': 'Could not retrieve leaderboard.'}), 500
+    return jsonify(page)
+
+
+@bp.route('/leaderboard/weekly', methods=['GET', 'POST'])
+@login_required
+def select_weekly_leaderboard_matchweek():
+    try:
+        seasons = Season.query.order_by(Season.season_start_year.desc()).all()
+        match_weeks = MatchWeek.query.options(joinedload(MatchWeek.week)) \
+            .order_by(MatchWeek.season_id.desc(), MatchWeek.week_id.desc()).all()
+    except SQLAlchemyError as e:
+        flash(f'Database error: {str(e)}', 'error')
+        return redirect(url_for('main.index'))
+
+    form = SelectMatchWeekForm()
+    form.submit.label.text = 'View Leaderboard'
+    form.season.choices = [(s.id, f"{s.season_start_year}/{s.season_end_year}") for s in seasons]
+    form.match_week.choices = [(mw.id, f"Week {mw.week.week_number}") for mw in match_weeks]
+
+    if form.validate_on_submit():
+        return redirect(url_for('main.weekly_leaderboard', match_week_id=form.match_week.data))
+
+    return render_template('admin/select_form.html', heading='Weekly Leaderboard', title='Weekly Leaderboard',
+                           form=form)
+
+
+@bp.route('/leaderboard/weekly/<int:match_week_id>')
+@login_required
+@conditional(lambda match_week_id: (GLOBAL, match_week_id))
+def weekly_leaderboard(match_week_id):
+    limit = request.args.get('limit', PAGE_SIZE, type=int)
+    try:
+        match_week = MatchWeek.query.get_or_404(match_week_id)
+        page = get_weekly_leaderboard_page(match_week.id, request.args.get('after'), limit)
+        my_position = get_weekly_position(match_week.id, current_user.id)
+    except SQLAlchemyError as e:
+        flash(f'Database error: {str(e)}', 'error')
+        return redirect(url_for('main.index'))
+
+    return render_template(
+        'weekly_leaderboard.html',
+        heading='Weekly Leaderboard',
+        subheading=f'Week {match_week.week.week_number} - '
+                   f'{match_week.season.season_start_year}/{match_week.season.season_end_year}',
+        weekly_scores=page['scores'],
+        next_cursor=page['next'],
+        limit=limit if limit != PAGE_SIZE else None,
+        my_position=my_position,
+        match_week_id=match_week.id
+    )
+
+
+@bp.route('/leaderboard/live')
+@login_required
+def live_leaderboard():
+    from .live import get_live_board
+
+    try:
+        board = get_live_board()
+    except SQLAlchemyError as e:
+        flash(f'Database error: {str(e)}', 'error')
+        return redirect(url_for('main.index'))
+    snapshot = board.snapshot(limit=PAGE_SIZE, user_id=current_user.id) if board else None
+    return render_template('live_leaderboard.html', snapshot=snapshot)
+
+
+@bp.route('/api/live')
+@login_required
+def api_live():
+    from .live import get_live_board
+
+    try:
+        board = get_live_board()
+    except SQLAlchemyError:
+        return jsonify({'error': 'Could not retrieve live standings.'}), 500
+    if board is None:
+        return jsonify({'error': 'No active match week.'}), 404
+    limit = min(max(request.args.get('limit', PAGE_SIZE, type=int), 1), MAX_PAGE_SIZE)
+    return jsonify(board.snapshot(limit=limit, user_id=current_user.id))
+
+
+@bp.route('/events')
+@login_required
+def events():
+    if not event_publisher.has_capacity():
+        return Response('Too many live connections, poll instead.', status=503, headers={'Retry-After': '30'})
+    return Response(event_publisher.stream(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+@bp.route('/admin/live/<int:fixture_id>', methods=['POST'])
+@login_required
+def update_live_score(fixture_id):
+    from .live import apply_live_scores
+
+    if not current_user.is_admin:
+        return jsonify({'error': 'Access denied. Admin privileges required.'}), 403
+
+    data = request.get_json(silent=True) or request.form
+    try:
+        home_score, away_score = int(data['home_score']), int(data['away_score'])
+    except (KeyError, TypeError, ValueError):
+        return jsonify({'error': 'home_score and away_score must be integers.'}), 400
+    if home_score < 0 or away_score < 0:
+        return jsonify({'error': 'Scores cannot be negative.'}), 400
+
+    rows = [{'fixture_id': fixture_id, 'home_score': home_score, 'away_score': away_score}]
+    try:
+        Fixture.query.get_or_404(fixture_id)
+        LiveScore.record(rows)
+        db.session.commit()
+    except SQLAlchemyError:
+        db.session.rollback()
+        return jsonify({'error': 'Could not save live score.'}), 500
+
+    apply_live_scores(rows)
+    return jsonify(rows[0])
+
+
+def _queue_export(options, fallback):
+    try:
+        job = enqueue('export', options, user_id=current_user.id)
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        flash(f'Error queueing export: {str(e)}', 'error')
+        return redirect(fallback)
+    flash('Export queued. The download will be available here once it is ready.', 'info')
+    return redirect(url_for('main.job_status', job_id=job.id))
+
+
+@bp.route('/admin/leaderboard/pdf')
+@login_required
+def download_leaderboard_pdf():
+    if not current_user.is_admin:
+        flash('Access denied. Admin privileges required.', 'error')
+        return redirect(url_for('main.index'))
+
+    return _queue_export({
+        'format': 'pdf',
+        'scope': 'overall',
+        'title': 'Leaderboard',
+        'filename': f'leaderboard_{date.today().isoformat()}.pdf',
+    }, url_for('main.leaderboard'))
+
+
+@bp.route('/admin/leaderboard/weekly/<int:match_week_id>/pdf')
+@login_required
+def download_weekly_leaderboard_pdf(match_week_id):
+    if not current_user.is_admin:
+        flash('Access denied. Admin privileges required.', 'error')
+        return redirect(url_for('main.index'))
+
+    try:
+        match_week = MatchWeek.query.get_or_404(match_week_id)
+    except SQLAlchemyError:
+        abort(500)
+
+    return _queue_export({
+        'format': 'pdf',
+        'scope': 'weekly',
+        'match_week_id': match_week.id,
+        'title': 'Weekly Leaderboard',
+        'subtitle': f'Week {match_week.week.week_number} - '
+                    f'{match_week.season.season_start_year}/{match_week.season.season_end_year}',
+        'filename': f'weekly_leaderboard_week_{match_week.week.week_number}.pdf',
+    }, url_for('main.weekly_leaderboard', match_week_id=match_week.id))
+
+
+@bp.route('/admin/leaderboard/weekly/<int:match_week_id>/excel')
+@login_required
+def download_scores_excel(match_week_id):
+    if not current_user.is_admin:
+        flash('Access denied. Admin privileges required.', 'error')
         return redirect(url_for('main.index'))
 
-    match_week_id = open_fixtures[0].match_week_id
     try:
         match_week = MatchWeek.query.get_or_404(match_week_id)
     except SQLAlchemyError:
-        flash('Could not find the corresponding match week.', 'error')
+        abort(500)
+
+    return _queue_export({
+        'format': 'xlsx',
+        'scope': 'weekly',
+        'match_week_id': match_week.id,
+        'title': f'Week {match_week.week.week_number}',
+        'filename': f'scores_week_{match_week.week.week_number}.xlsx',
+    }, url_for('main.weekly_leaderboard', match_week_id=match_week.id))
+
+
+@bp.route('/admin/scores', methods=['GET', 'POST'])
+@login_required
+def select_scores_matchweek():
+    if not current_user.is_admin:
+        flash('Access denied. Admin privileges required.', 'error')
+        return redirect(url_for('main.index'))
+
+    try:
+        seasons = Season.query.order_by(Season.season_start_year.desc()).all()
+        match_weeks = MatchWeek.query.options(joinedload(MatchWeek.week)) \
+            .order_by(MatchWeek.season_id.desc(), MatchWeek.week_id.desc()).all()
+    except SQLAlchemyError as e:
+        flash(f'Database error: {str(e)}', 'error')
+        return redirect(url_for('main.admin_dashboard'))
+
+    form = SelectMatchWeekForm()
+    form.submit.label.text = 'Enter Results'
+    form.season.choices = [(s.id, f"{s.season_start_year}/{s.season_end_year}") for s in seasons]
+    form.match_week.choices = [(mw.id, f"Week {mw.week.week_number}") for mw in match_weeks]
+
+    if form.validate_on_submit():
+        match_week = next(mw for mw in match_weeks if mw.id == form.match_week.data)
+        return redirect(url_for('main.update_scores', week_id=match_week.week_id, season_id=match_week.season_id))
+
+    return render_template('admin/select_form.html', heading='Update Scores', title='Update Scores', form=form)
+
+
+@bp.route('/admin/scores/<int:season_id>/<int:week_id>', methods=['GET', 'POST'])
+@login_required
+def update_scores(season_id, week_id):
+    # numpy/pandas are only loaded when results are first entered, not at worker start.
+    from .live import apply_live_scores
+    from .scoring import rescore_fixtures
+
+    if not current_user.is_admin:
+        flash('Access denied. Admin privileges required.', 'error')
+        return redirect(url_for('main.index'))
+
+    try:
+        match_week = MatchWeek.query.options(joinedload(MatchWeek.week)) \
+            .filter_by(season_id=season_id, week_id=week_id).first_or_404()
+        fixtures = Fixture.query.options(joinedload(Fixture.home_team), joinedload(Fixture.away_team)) \
+            .filter_by(match_week_id=match_week.id).order_by(Fixture.id).all()
+    except SQLAlchemyError:
+        abort(500)
+
+    form = DynamicResultsForm()
+    while len(form.matches) < len(fixtures):
+        form.matches.append_entry()
+    while len(form.matches) > len(fixtures):
+        form.matches.pop_entry()
+
+    if request.method == 'GET':
+        for fixture, match_form in zip(fixtures, form.matches):
+            match_form.home_team.data = fixture.home_team.name if fixture.home_team else 'Unknown'
+            match_form.away_team.data = fixture.away_team.name if fixture.away_team else 'Unknown'
+            match_form.home_score.data = fixture.home_score
+            match_form.away_score.data = fixture.away_score
+
+    if form.validate_on_submit():
+        # Only fixtures whose result actually changed are written and re-scored, so results
+        # entered on Saturday are not scored again when Sunday's games are added.
+        changes = []
+        for i, (fixture, match_form) in enumerate(zip(fixtures, form.matches)):
+            home_score, away_score = match_form.home_score.data, match_form.away_score.data
+            if (home_score is None) != (away_score is None):
+                flash(f'Match {i + 1}: enter both scores or leave both blank.', 'error')
+                continue
+            is_completed = home_score is not None
+            if (fixture.home_score, fixture.away_score, bool(fixture.is_completed)) == \
+                    (home_score, away_score, is_completed):
+                continue
+            changes.append({'id': fixture.id, 'home_score': home_score, 'away_score': away_score,
+                            'is_completed': is_completed})
+
+        if not changes:
+            flash('No results changed.', 'info')
+            return redirect(url_for('main.update_scores', season_id=season_id, week_id=week_id))
+
+        try:
+            db.session.execute(update(Fixture), changes)
+            result = rescore_fixtures([change['id'] for change in changes])
+            # Final results also drive the live board, so every worker's provisional table settles on them.
+            live_rows = [{'fixture_id': change['id'], 'home_score': change['home_score'],
+                          'away_score': change['away_score']} for change in changes]
+            LiveScore.record(live_rows)
+            touch(match_week.id)
+            db.session.commit()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            flash(f'Error saving results: {str(e)}', 'error')
+            return redirect(url_for('main.update_scores', season_id=season_id, week_id=week_id))
+
+        invalidate_leaderboards()
+        apply_live_scores(live_rows)
+        flash(f'{len(changes)} results saved; {result["changed"]} predictions re-scored.', 'success')
+        return redirect(url_for('main.update_scores', season_id=season_id, week_id=week_id))
+
+    elif request.method == 'POST':
+        for field, errors in form.errors.items():
+            for error in errors:
+                flash(f'Error in field {field}: {error}', 'error')
+
+    return render_template('update_scores.html', form=form, match_week=match_week)
+
+
+def _prediction_scopes():
+    match_week_id = request.args.get('match_week_id', type=int)
+    return (GLOBAL, match_week_id) if match_week_id else (GLOBAL,)
+
+
+def _own_predictions_state():
+    # Saving predictions does not bump a data version, so the page also varies on the user's own rows.
+    match_week_id = request.args.get('match_week_id', type=int)
+    if not match_week_id:
+        return None
+    return tuple(db.session.execute(
+        select(func.count(Prediction.id), func.max(Prediction.updated_at))
+        .join(Fixture, Prediction.fixture_id == Fixture.id)
+        .where(Prediction.user_id == current_user.id, Fixture.match_week_id == match_week_id)
+    ).one())
+
+
+@bp.route('/predictions', methods=['GET', 'POST'])
+@login_required
+@conditional(_prediction_scopes, extra=_own_predictions_state)
+def view_prediction():
+    try:
+        seasons = Season.query.order_by(Season.season_start_year.desc()).all()
+        match_weeks = MatchWeek.query.options(joinedload(MatchWeek.week)) \
+            .order_by(MatchWeek.season_id.desc(), MatchWeek.week_id.desc()).all()
+    except SQLAlchemyError as e:
+        flash(f'Database error: {str(e)}', 'error')
+        return redirect(url_for('main.index'))
+
+    form = SelectMatchWeekForm()
+    form.season.choices = [(s.id, f"{s.season_start_year}/{s.season_end_year}") for s in seasons]
+    form.match_week.choices = [(mw.id, f"Week {mw.week.week_number}") for mw in match_weeks]
+
+    if form.validate_on_submit():
+        return redirect(url_for('main.view_prediction', match_week_id=form.match_week.data))
+
+    selected_match_week = None
+    predictions = []
+    match_week_id = request.args.get('match_week_id', type=int)
+    if match_week_id:
+        selected_match_week = next((mw for mw in match_weeks if mw.id == match_week_id), None)
+        if selected_match_week is None:
+            abort(404)
+        try:
+            predictions = Prediction.query.join(Fixture, Prediction.fixture_id == Fixture.id).options(
+                joinedload(Prediction.fixture).options(joinedload(Fixture.home_team), joinedload(Fixture.away_team))
+            ).filter(Prediction.user_id == current_user.id, Fixture.match_week_id == match_week_id) \
+                .order_by(Fixture.id).all()
+        except SQLAlchemyError as e:
+            flash(f'Database error: {str(e)}', 'error')
+            return redirect(url_for('main.index'))
+        if not predictions:
+            flash(f'You have no predictions for Week {selected_match_week.week.week_number}.', 'info')
+
+    return render_template('view_predictions.html', form=form, predictions=predictions,
+                           selected_match_week=selected_match_week)
+
+
+@bp.route('/matches', methods=['GET', 'POST'])
+@login_required
+def predict():
+    # The deadline applies to when the submission arrived, not when it is written.
+    arrived_at = datetime.utcnow()
+    try:
+        snapshot = get_open_snapshot()
+    except SQLAlchemyError as e:
+        flash(f'Database error: {str(e)}', 'error')
+        return redirect(url_for('main.index'))
+
+    match_week = snapshot.open_match_week
+    open_fixtures = snapshot.fixtures
+    if not match_week or not match_week.predictions_open_at(arrived_at):
+        flash("Predictions not open at the moment", 'info')
         return redirect(url_for('main.index'))
 
     user_predictions = {}
@@ -495,8 +1008,8 @@ def predict():
             flash(f'Error retrieving existing predictions: {str(e)}', 'error')
             return redirect(url_for('main.index'))
 
-    class DynamicMatchesForm():
-        matches = FieldList(FormField(PredictionForm), min_entries=1, max_entries=20)
+    class DynamicMatchesForm(FlaskForm):
+        matches = FieldList(FormField(MatchRowForm), min_entries=1, max_entries=20)
         submit = SubmitField('Submit Predictions')
 
     form = DynamicMatchesForm()
@@ -509,8 +1022,8 @@ def predict():
     if request.method == 'GET':
         for i, fixture in enumerate(open_fixtures):
             if i < len(form.matches):
-                form.matches[i].home_team.data = fixture.home_team.name
-                form.matches[i].away_team.data = fixture.away_team.name
+                form.matches[i].home_team.data = fixture.home_team_name
+                form.matches[i].away_team.data = fixture.away_team_name
 
                 if current_user.is_authenticated and fixture.id in user_predictions:
                     prediction = user_predictions[fixture.id]
@@ -523,44 +1036,41 @@ def predict():
     if form.validate_on_submit():
         user_id = current_user.id
         try:
-            predictions_saved = 0
-            for i, match_form in enumerate(form.matches):
-                fixture = open_fixtures[i]
-                existing_prediction = Prediction.query.filter_by(
-                    user_id=user_id, fixture_id=fixture.id
-                ).first()
-
-                home_team = Team.query.filter_by(name=match_form.home_team.data).first()
-                away_team = Team.query.filter_by(name=match_form.away_team.data).first()
-                if not home_team or not away_team:
+            # Take team ids from the fixtures themselves and write every row with one upsert.
+            rows = []
+            for i, (fixture, match_form) in enumerate(zip(open_fixtures, form.matches)):
+                if not fixture.home_team_id or not fixture.away_team_id:
                     flash(f'Error: Could not find team data for match {i + 1}.', 'error')
                     continue
 
-                if existing_prediction:
-                    existing_prediction.home_team_id = home_team.id
-                    existing_prediction.away_team_id = away_team.id
-                    existing_prediction.home_score_prediction = match_form.home_score.data
-                    existing_prediction.away_score_prediction = match_form.away_score.data
-                    existing_prediction.updated_at = datetime.utcnow()
-                else:
-                    prediction = Prediction(
-                        user_id=user_id,
-                        fixture_id=fixture.id,
-                        home_team_id=home_team.id,
-                        away_team_id=away_team.id,
-                        home_score_prediction=match_form.home_score.data,
-                        away_score_prediction=match_form.away_score.data
-                    )
-                    db.session.add(prediction)
-                predictions_saved += 1
+                rows.append({
+                    'user_id': user_id,
+                    'fixture_id': fixture.id,
+                    'home_team_id': fixture.home_team_id,
+                    'away_team_id': fixture.away_team_id,
+                    'home_score_prediction': match_form.home_score.data,
+                    'away_score_prediction': match_form.away_score.data,
+                })
+
+            if prediction_writer.enabled:
+                # Hand the connection back while waiting on the batch, so a deadline rush cannot drain the pool.
+                db.session.close()
+                prediction_writer.save(rows)
+            else:
+                Prediction.upsert(rows)
+                db.session.commit()
+            predictions_saved = len(rows)
 
-            db.session.commit()
             flash(f'{predictions_saved} predictions saved successfully!', 'success')
             return redirect(url_for('main.index'))
         except SQLAlchemyError as e:
             db.session.rollback()
             flash(f'Error saving predictions: {str(e)}', 'error')
             return redirect(url_for('main.index'))
+        except TimeoutError:
+            flash('Saving your predictions is taking longer than usual. Please check them and submit again.',
+                  'error')
+            return redirect(url_for('main.index'))
     elif request.method == 'POST':
         for field, errors in form.errors.items():
             for error in errors:
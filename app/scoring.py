@@ -0,0 +1,249 @@
+"""
+Match week scoring.
+
+Predictions for a match week are loaded with a single query, scored as numpy
+array operations and written back with one executemany UPDATE, so scoring
+cost is dominated by I/O rather than per-row ORM work. Only point deltas are
+posted to MatchWeekPoint and User.total_points, which keeps corrections to a
+single fixture cheap; rebuild_points() recomputes everything from scratch.
+Whenever points change, the precomputed leaderboard tables are rebuilt and
+swapped in as part of the same transaction.
+"""
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import select, update, insert, delete, func, bindparam
+
+from . import db
+from .models import Prediction, Fixture, MatchWeekPoint, User
+from .leaderboard import rebuild_snapshots
+from .versions import touch
+
+EXACT_SCORE_POINTS = 3
+GOAL_DIFFERENCE_POINTS = 2
+CORRECT_RESULT_POINTS = 1
+
+PREDICTION_COLUMNS = [
+    'id', 'user_id', 'fixture_id', 'match_week_id', 'home_score_prediction', 'away_score_prediction',
+    'points_earned', 'home_score', 'away_score'
+]
+
+user_table = User.__table__
+
+
+def load_predictions(*criteria):
+    """Return predictions matching ``criteria`` joined to their fixture result as a DataFrame."""
+    stmt = (
+        select(
+            Prediction.id, Prediction.user_id, Prediction.fixture_id, Fixture.match_week_id,
+            Prediction.home_score_prediction, Prediction.away_score_prediction,
+            Prediction.points_earned, Fixture.home_score, Fixture.away_score
+        )
+        .join(Fixture, Prediction.fixture_id == Fixture.id)
+        .where(*criteria)
+    )
+    rows = db.session.execute(stmt).all()
+    return pd.DataFrame.from_records(rows, columns=PREDICTION_COLUMNS)
+
+
+def load_match_week_predictions(match_week_id):
+    """Return every prediction of a match week joined to its fixture result as a DataFrame."""
+    return load_predictions(Fixture.match_week_id == match_week_id)
+
+
+def score_arrays(predicted_home, predicted_away, actual_home, actual_away):
+    """
+    Score predicted against actual scores element-wise (inputs broadcast).
+
+    Exact scores earn EXACT_SCORE_POINTS, the right result with the right goal
+    difference earns GOAL_DIFFERENCE_POINTS and any other right result earns
+    CORRECT_RESULT_POINTS. NaN on either side (no result yet, no prediction)
+    scores zero.
+    """
+    predicted_home = np.asarray(predicted_home, dtype=float)
+    predicted_away = np.asarray(predicted_away, dtype=float)
+    actual_home = np.asarray(actual_home, dtype=float)
+    actual_away = np.asarray(actual_away, dtype=float)
+
+    played = ~(np.isnan(actual_home) | np.isnan(actual_away))
+    predicted_diff = predicted_home - predicted_away
+    actual_diff = actual_home - actual_away
+
+    exact = played & (predicted_home == actual_home) & (predicted_away == actual_away)
+    same_difference = played & (predicted_diff == actual_diff)
+    same_result = played & (np.sign(predicted_diff) == np.sign(actual_diff))
+
+    return np.select(
+        [exact, same_difference, same_result],
+        [EXACT_SCORE_POINTS, GOAL_DIFFERENCE_POINTS, CORRECT_RESULT_POINTS],
+        default=0
+    ).astype(np.int64)
+
+
+def score_predictions(frame):
+    """Score a frame from load_predictions() against its fixture results."""
+    return score_arrays(
+        frame['home_score_prediction'].to_numpy(dtype=float),
+        frame['away_score_prediction'].to_numpy(dtype=float),
+        frame['home_score'].to_numpy(dtype=float),
+        frame['away_score'].to_numpy(dtype=float),
+    )
+
+
+def _write_prediction_points(frame, points, changed):
+    params = [
+        {'id': int(prediction_id), 'points_earned': int(value)}
+        for prediction_id, value in zip(frame['id'].to_numpy()[changed], points[changed])
+    ]
+    if params:
+        db.session.execute(update(Prediction), params)
+
+
+def _apply_match_week_deltas(frame, delta):
+    """Add per-user deltas to MatchWeekPoint, creating rows for players scored for the first time."""
+    week_deltas = (
+        pd.DataFrame({'user_id': frame['user_id'], 'match_week_id': frame['match_week_id'], 'delta': delta})
+        .groupby(['user_id', 'match_week_id'])['delta'].sum()
+    )
+    MatchWeekPoint.add_points([
+        {'user_id': int(user_id), 'match_week_id': int(match_week_id), 'points': int(value)}
+        for (user_id, match_week_id), value in week_deltas.items()
+    ])
+    return sorted(int(match_week_id) for match_week_id in frame['match_week_id'].unique())
+
+
+def _apply_total_deltas(frame, delta):
+    user_deltas = pd.Series(delta, index=frame['user_id'].to_numpy()).groupby(level=0).sum()
+    params = [
+        {'b_user_id': int(user_id), 'b_delta': int(value)}
+        for user_id, value in user_deltas.items() if value
+    ]
+    if params:
+        db.session.execute(
+            update(user_table)
+            .where(user_table.c.id == bindparam('b_user_id'))
+            .values(total_points=func.coalesce(user_table.c.total_points, 0) + bindparam('b_delta')),
+            params
+        )
+    return len(params)
+
+
+def apply_scores(frame):
+    """
+    Score ``frame`` and post only the point deltas to the ledger.
+
+    Prediction.points_earned, MatchWeekPoint.points and User.total_points are
+    adjusted by the difference between the new and previously stored points,
+    so re-scoring one fixture never touches the rest of the season.
+    """
+    if frame.empty:
+        return {'predictions': 0, 'changed': 0, 'users': 0}
+
+    points = score_predictions(frame)
+    delta = points - frame['points_earned'].fillna(0).to_numpy(dtype=np.int64)
+    changed = delta != 0
+
+    _write_prediction_points(frame, points, changed)
+    match_week_ids = _apply_match_week_deltas(frame, delta)
+    for match_week_id in match_week_ids:
+        MatchWeekPoint.rank_match_week(match_week_id)
+    users = _apply_total_deltas(frame, delta)
+    if changed.any():
+        rebuild_snapshots(match_week_ids, user_ids=np.unique(frame['user_id'].to_numpy()).tolist())
+        touch(*match_week_ids)
+
+    return {'predictions': len(frame), 'changed': int(changed.sum()), 'users': users}
+
+
+def score_match_week(match_week_id):
+    """
+    Score every prediction of a match week and post the changes to the ledger.
+
+    Returns a dict with the number of predictions scored, predictions whose
+    points changed and users whose total changed. The caller is responsible
+    for committing.
+    """
+    return apply_scores(load_match_week_predictions(match_week_id))
+
+
+def rescore_fixtures(fixture_ids):
+    """Re-score only the given fixtures, e.g. after a corrected result. The caller commits."""
+    return apply_scores(load_predictions(Fixture.id.in_(list(fixture_ids))))
+
+
+def find_drift():
+    """
+    Compare the ledger against what the Prediction rows imply.
+
+    Returns a dict with the (user_id, match_week_id, stored, expected) tuples of
+    MatchWeekPoint rows and the (user_id, stored, expected) tuples of users whose
+    stored points disagree with their predictions.
+    """
+    expected_weeks = pd.DataFrame.from_records(db.session.execute(
+        select(Prediction.user_id, Fixture.match_week_id,
+               func.coalesce(func.sum(Prediction.points_earned), 0))
+        .join(Fixture, Prediction.fixture_id == Fixture.id)
+        .group_by(Prediction.user_id, Fixture.match_week_id)
+    ).all(), columns=['user_id', 'match_week_id', 'expected'])
+    stored_weeks = pd.DataFrame.from_records(db.session.execute(
+        select(MatchWeekPoint.user_id, MatchWeekPoint.match_week_id,
+               func.coalesce(MatchWeekPoint.points, 0))
+    ).all(), columns=['user_id', 'match_week_id', 'stored'])
+
+    weeks = stored_weeks.merge(expected_weeks, on=['user_id', 'match_week_id'], how='outer').fillna(0)
+    weeks = weeks[weeks['stored'] != weeks['expected']]
+
+    expected_totals = expected_weeks.groupby('user_id')['expected'].sum()
+    stored_totals = pd.DataFrame.from_records(db.session.execute(
+        select(User.id, func.coalesce(User.total_points, 0))
+    ).all(), columns=['user_id', 'stored']).set_index('user_id')['stored']
+    totals = pd.DataFrame({'stored': stored_totals, 'expected': expected_totals}).fillna(0)
+    totals = totals[totals['stored'] != totals['expected']]
+
+    return {
+        'match_weeks': [(int(row.user_id), int(row.match_week_id), int(row.stored), int(row.expected))
+                        for row in weeks.itertuples()],
+        'users': [(int(user_id), int(row.stored), int(row.expected)) for user_id, row in totals.iterrows()],
+    }
+
+
+def rebuild_points():
+    """
+    Rebuild the whole ledger from Prediction rows.
+
+    Every match week is re-scored, then MatchWeekPoint and User.total_points are
+    overwritten with set-based INSERT ... SELECT / UPDATE statements, every
+    week is re-ranked and the leaderboard tables are rebuilt. The caller is
+    responsible for committing.
+    """
+    match_week_ids = db.session.scalars(select(Fixture.match_week_id).distinct()).all()
+    predictions = 0
+    for match_week_id in match_week_ids:
+        frame = load_match_week_predictions(match_week_id)
+        if frame.empty:
+            continue
+        points = score_predictions(frame)
+        _write_prediction_points(frame, points, points != frame['points_earned'].fillna(0).to_numpy(dtype=np.int64))
+        predictions += len(frame)
+
+    db.session.execute(delete(MatchWeekPoint))
+    db.session.execute(insert(MatchWeekPoint).from_select(
+        ['user_id', 'match_week_id', 'points'],
+        select(Prediction.user_id, Fixture.match_week_id, func.coalesce(func.sum(Prediction.points_earned), 0))
+        .join(Fixture, Prediction.fixture_id == Fixture.id)
+        .group_by(Prediction.user_id, Fixture.match_week_id)
+    ))
+    for match_week_id in match_week_ids:
+        MatchWeekPoint.rank_match_week(match_week_id)
+
+    db.session.execute(
+        update(User).values(total_points=(
+            select(func.coalesce(func.sum(MatchWeekPoint.points), 0))
+            .where(MatchWeekPoint.user_id == User.id)
+            .scalar_subquery()
+        )),
+        execution_options={'synchronize_session': False}
+    )
+    rebuild_snapshots(match_week_ids)
+    touch(*match_week_ids)
+    return {'predictions': predictions, 'match_weeks': len(match_week_ids)}
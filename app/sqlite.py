@@ -0,0 +1,105 @@
+"""
+SQLite engine profiles.
+
+The ``production`` profile (the default; set SQLITE_PROFILE=default for a
+stock engine) puts the database in WAL mode so readers never block the
+writer, relaxes fsyncs to synchronous=NORMAL (still safe in WAL), waits up
+to busy_timeout for the write lock instead of failing with "database is
+locked", and reads through a memory-mapped view of the file that every
+connection shares via the OS page cache, so each connection's private page
+cache stays small. SQLite runs one writer at a time and a page request only
+holds a connection for its few milliseconds, so a few connections per pool
+serve all of a worker's gunicorn threads, most of which sit in /events
+streams holding no connection at all. A worker opens at most
+2 x (pool_size + max_overflow) connections of cache_size each.
+
+It also adds a ``read`` bind: a second pool on the same file whose
+connections are query_only. Read-heavy views pass read_bind() to
+Session.execute so leaderboard and export queries never occupy a connection
+from the writer's pool.
+"""
+
+import os
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+from . import db
+
+READ_BIND = 'read'
+
+PROFILES = {
+    'default': None,
+    'production': {
+        'pragmas': {
+            'journal_mode': 'WAL',
+            'synchronous': 'NORMAL',
+            'busy_timeout': 5000,
+            'mmap_size': 256 * 1024 * 1024,
+            'cache_size': -8 * 1024,  # negative means KiB, so 8 MiB per connection on top of the shared mmap
+            'temp_store': 'MEMORY',
+        },
+        'pool_size': 4,
+        'max_overflow': 2,
+        'pool_timeout': 10,
+        'read_pool_size': 4,
+    },
+}
+
+
+def _is_file_database(uri):
+    url = make_url(uri)
+    return url.get_backend_name() == 'sqlite' and url.database not in (None, '', ':memory:') \
+        and not url.database.startswith('file::memory:')
+
+
+def configure_sqlite(app):
+    """Set engine options and the read bind from SQLITE_PROFILE; call before db.init_app()."""
+    profile_name = app.config.setdefault('SQLITE_PROFILE', os.environ.get('SQLITE_PROFILE', 'production'))
+    if profile_name not in PROFILES:
+        raise ValueError(f'Unknown SQLITE_PROFILE {profile_name!r}, expected one of {sorted(PROFILES)}')
+    profile = PROFILES[profile_name]
+    uri = app.config['SQLALCHEMY_DATABASE_URI']
+    if profile is None or not _is_file_database(uri):
+        app.config['SQLITE_PRAGMAS'] = {}
+        return
+
+    app.config.setdefault('SQLITE_PRAGMAS', dict(profile['pragmas']))
+    engine_options = app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {})
+    engine_options.setdefault('pool_size', profile['pool_size'])
+    engine_options.setdefault('max_overflow', profile['max_overflow'])
+    engine_options.setdefault('pool_timeout', profile['pool_timeout'])
+    app.config.setdefault('SQLALCHEMY_BINDS', {}).setdefault(READ_BIND, {
+        'url': uri,
+        'pool_size': profile['read_pool_size'],
+        'max_overflow': profile['max_overflow'],
+        'pool_timeout': profile['pool_timeout'],
+    })
+
+
+def _pragma_listener(pragmas, read_only):
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        if read_only:
+            cursor.execute('PRAGMA query_only=ON')
+        cursor.close()
+    return on_connect
+
+
+def install_sqlite_pragmas(app):
+    """Apply SQLITE_PRAGMAS to every new connection; call after db.init_app()."""
+    pragmas = app.config.get('SQLITE_PRAGMAS')
+    if not pragmas:
+        return
+    with app.app_context():
+        for key, engine in db.engines.items():
+            if engine.dialect.name == 'sqlite':
+                event.listen(engine, 'connect', _pragma_listener(pragmas, read_only=key == READ_BIND))
+
+
+def read_bind():
+    """Bind arguments for Session.execute that route a read-only query to the read pool, if configured."""
+    engine = db.engines.get(READ_BIND)
+    return {'bind': engine} if engine is not None else None
@@ -0,0 +1,83 @@
+"""
+Cold start support.
+
+StartupTimer records how long each phase of create_app() takes and which
+packages it pulled in, in the spirit of ``python -X importtime`` but per
+phase; the report is logged at startup when STARTUP_TIMINGS is set and printed
+by ``flask startup-report``.
+
+schema_is_current() lets create_app() skip db.create_all() when the database
+is stamped with the latest migration, which is the normal case in production.
+"""
+
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+
+class StartupTimer:
+
+    def __init__(self):
+        self.phases = []
+
+    def record(self, name, started, finished, modules_before):
+        imported = set(sys.modules) - modules_before
+        self.phases.append({
+            'phase': name,
+            'ms': round((finished - started) * 1000, 1),
+            'modules': len(imported),
+            # Third-party and app packages only; the standard library is rarely what regressed.
+            'packages': sorted({
+                module.split('.')[0] for module in imported
+                if not module.startswith('_') and module.split('.')[0] not in sys.stdlib_module_names
+            }),
+        })
+
+    @contextmanager
+    def phase(self, name):
+        before = set(sys.modules)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, started, time.perf_counter(), before)
+
+    @property
+    def total_ms(self):
+        return round(sum(phase['ms'] for phase in self.phases), 1)
+
+    def report(self):
+        lines = [f'{"phase":<14} {"ms":>8} {"modules":>8}  new packages']
+        for phase in self.phases:
+            packages = ', '.join(phase['packages'][:12]) + (' ...' if len(phase['packages']) > 12 else '')
+            lines.append(f'{phase["phase"]:<14} {phase["ms"]:>8.1f} {phase["modules"]:>8}  {packages}')
+        lines.append(f'{"total":<14} {self.total_ms:>8.1f}')
+        return '\n'.join(lines)
+
+
+def migrations_directory(app):
+    directory = app.extensions['migrate'].directory
+    if os.path.isabs(directory):
+        return directory
+    return os.path.join(os.path.dirname(app.root_path), directory)
+
+
+def schema_is_current(app, engine):
+    """True if the database is stamped with every head revision in the migrations directory."""
+    directory = migrations_directory(app)
+    if not os.path.isdir(directory):
+        return False
+
+    from alembic.script import ScriptDirectory
+
+    heads = set(ScriptDirectory(directory).get_heads())
+    try:
+        with engine.connect() as connection:
+            stamped = set(connection.execute(text('SELECT version_num FROM alembic_version')).scalars())
+    except OperationalError:
+        return False
+    return bool(heads) and stamped == heads
@@ -0,0 +1,83 @@
+"""
+In-process registry of teams.
+
+There are only about twenty teams and they almost never change, so every
+lookup by id, name or short name is served from an immutable snapshot loaded
+once per process. The admin views that change teams call refresh_teams()
+after committing; RELOAD_AFTER bounds how long other workers keep an old copy.
+"""
+
+import threading
+import time
+from collections import namedtuple
+from types import MappingProxyType
+
+from sqlalchemy import select
+
+from . import db
+from .models import Team
+
+RELOAD_AFTER = 600
+
+TeamEntry = namedtuple('TeamEntry', ['id', 'name', 'short_name'])
+
+
+def _key(value):
+    return ('' if value is None else str(value)).strip().casefold()
+
+
+class TeamRegistry(namedtuple('TeamRegistry', ['teams', 'by_id', 'by_name', 'by_short_name'])):
+    __slots__ = ()
+
+    @classmethod
+    def build(cls, entries):
+        teams = tuple(sorted(entries, key=lambda team: team.name))
+        return cls(
+            teams,
+            MappingProxyType({team.id: team for team in teams}),
+            MappingProxyType({_key(team.name): team for team in teams}),
+            MappingProxyType({_key(team.short_name): team for team in teams if team.short_name}),
+        )
+
+    def get(self, team_id):
+        return self.by_id.get(int(team_id)) if team_id not in (None, '') else None
+
+    def lookup(self, name):
+        """Resolve a team by full or short name, ignoring case and surrounding whitespace."""
+        key = _key(name)
+        return self.by_name.get(key) or self.by_short_name.get(key)
+
+    def choices(self):
+        return [(team.id, team.name) for team in self.teams]
+
+
+_registry = None
+_loaded_at = 0.0
+_lock = threading.Lock()
+
+
+def _load():
+    rows = db.session.execute(select(Team.id, Team.name, Team.short_name)).all()
+    return TeamRegistry.build(TeamEntry(*row) for row in rows)
+
+
+def get_teams():
+    """Return the current TeamRegistry, loading it on first use."""
+    global _registry, _loaded_at
+    registry = _registry
+    if registry is not None and time.monotonic() - _loaded_at < RELOAD_AFTER:
+        return registry
+    with _lock:
+        if _registry is None or time.monotonic() - _loaded_at >= RELOAD_AFTER:
+            _registry = _load()
+            _loaded_at = time.monotonic()
+        return _registry
+
+
+def refresh_teams():
+    """Reload the registry; call after committing changes to Team rows."""
+    global _registry, _loaded_at
+    with _lock:
+        _registry = _load()
+        _loaded_at = time.monotonic()
+    return _registry
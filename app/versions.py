@@ -0,0 +1,196 @@
+"""
+Data versions and conditional GET for read-mostly pages.
+
+DataVersion keeps one write counter per scope: GLOBAL for what every page
+shows (teams, seasons, the list of match weeks and their windows) and one per
+match week for its fixtures, results and points. ORM writes to those models
+bump the matching scopes in the same transaction; bulk writes that bypass the
+ORM (result entry, scoring, fixture imports) call touch() themselves.
+
+Views wrapped in @conditional build a weak ETag from the versions of the
+scopes they show, the URL and the signed-in identity, and answer a matching
+If-None-Match with 304 before running the view, so a repeat refresh costs a
+cached version lookup instead of ORM queries and a Jinja render. Versions are
+cached in process for VERSION_TTL seconds; the worker that commits a write
+drops its copy at once. Caches behind those views key their entries on
+version_stamp(), so every worker moves to the new body when it moves to the
+new ETag, not when its own cache happens to expire.
+"""
+
+import hashlib
+import os
+from datetime import datetime, timezone
+from functools import lru_cache, wraps
+
+from flask import current_app, make_response, request, session
+from flask_login import current_user
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, object_session
+
+from . import db
+from .cache import TTLCache
+from .models import DataVersion, MatchWeek, Fixture, Team, Season, Week
+from .sqlite import read_bind
+
+GLOBAL = 0
+ALL = None
+VERSION_TTL = 1
+
+version_cache = TTLCache(maxsize=1, ttl=VERSION_TTL)
+
+
+def _load_versions():
+    rows = db.session.execute(
+        select(DataVersion.scope, DataVersion.version, DataVersion.updated_at),
+        bind_arguments=read_bind()
+    ).all()
+    return {row.scope: (row.version, row.updated_at) for row in rows}
+
+
+def get_versions():
+    """Return ``{scope: (version, updated_at)}`` for every scope written so far."""
+    return version_cache.get_or_set('versions', _load_versions)
+
+
+def _state(versions, scopes):
+    scopes = sorted(versions) if scopes is ALL else scopes
+    return tuple((scope, versions.get(scope, (0, None))[0]) for scope in scopes)
+
+
+def version_stamp(scopes, versions=None):
+    """
+    Versions of ``scopes`` (or ALL) as a hashable value. Per-process caches
+    of what a @conditional page shows key their entries on it, so a body is
+    never served under an ETag of newer data than it was built from. Pass
+    ``versions`` from get_versions() to stamp against a copy read earlier.
+    """
+    return _state(get_versions() if versions is None else versions, scopes)
+
+
+def touch(*scopes):
+    """Bump ``scopes`` in the caller's transaction; pages showing them change ETag once it commits."""
+    DataVersion.bump(sorted(set(scopes)))
+    db.session.info['data_versions_touched'] = True
+
+
+# ######### ORM EVENTS ########
+
+def _remember(target, scopes):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault('pending_data_versions', set()).update(scopes)
+
+
+@event.listens_for(MatchWeek, 'after_insert')
+@event.listens_for(MatchWeek, 'after_update')
+@event.listens_for(MatchWeek, 'after_delete')
+def _match_week_changed(mapper, connection, target):
+    _remember(target, (GLOBAL, target.id))
+
+
+@event.listens_for(Fixture, 'after_insert')
+@event.listens_for(Fixture, 'after_update')
+@event.listens_for(Fixture, 'after_delete')
+def _fixture_changed(mapper, connection, target):
+    _remember(target, (target.match_week_id,))
+
+
+@event.listens_for(Team, 'after_insert')
+@event.listens_for(Team, 'after_update')
+@event.listens_for(Team, 'after_delete')
+@event.listens_for(Season, 'after_insert')
+@event.listens_for(Season, 'after_update')
+@event.listens_for(Season, 'after_delete')
+@event.listens_for(Week, 'after_insert')
+@event.listens_for(Week, 'after_update')
+@event.listens_for(Week, 'after_delete')
+def _shared_data_changed(mapper, connection, target):
+    _remember(target, (GLOBAL,))
+
+
+@event.listens_for(Session, 'after_flush')
+def _bump_pending_versions(session, flush_context):
+    scopes = session.info.pop('pending_data_versions', None)
+    if scopes:
+        DataVersion.bump(sorted(scopes), session)
+        session.info['data_versions_touched'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _drop_cached_versions(session):
+    if session.info.pop('data_versions_touched', False):
+        version_cache.clear()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_versions(session):
+    session.info.pop('pending_data_versions', None)
+    session.info.pop('data_versions_touched', None)
+
+
+# ######### CONDITIONAL GET ########
+
+@lru_cache(maxsize=None)
+def _code_stamp(root_path):
+    """Newest modification time of the app's code and templates, so a deploy changes every ETag."""
+    newest = 0
+    for directory, _, filenames in os.walk(root_path):
+        for filename in filenames:
+            if filename.endswith(('.py', '.html')):
+                newest = max(newest, os.path.getmtime(os.path.join(directory, filename)))
+    return datetime.fromtimestamp(int(newest), timezone.utc)
+
+
+def _validators(scopes, extra):
+    versions = get_versions()
+    scopes = sorted(versions) if scopes is ALL else scopes
+    state = _state(versions, scopes)
+    code_stamp = _code_stamp(current_app.root_path)
+    identity = repr(current_user) if current_user.is_authenticated else None
+    etag = hashlib.sha1(repr((code_stamp, request.full_path, identity, state, extra)).encode()).hexdigest()
+    last_modified = max([code_stamp] + [
+        versions[scope][1].replace(microsecond=0, tzinfo=timezone.utc) for scope in scopes if scope in versions
+    ])
+    return etag, last_modified
+
+
+def _not_modified(etag, last_modified, per_user):
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    # Last-Modified says nothing about who the page was rendered for or time-based state, so a bare
+    # If-Modified-Since is only trusted for pages that do not depend on either.
+    return not per_user and request.if_modified_since is not None and last_modified <= request.if_modified_since
+
+
+def conditional(scopes, extra=None):
+    """
+    Serve 304 Not Modified to clients that already have the current page.
+
+    ``scopes`` is called with the view's arguments and returns the scopes whose
+    data the page shows, or ALL. ``extra``, if given, returns anything else the
+    page depends on (such as which prediction windows are open right now).
+    Pages with pending flash messages are always rendered and never cached.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(**kwargs):
+            if request.method != 'GET' or '_flashes' in session:
+                return view(**kwargs)
+
+            extra_state = extra() if extra else None
+            etag, last_modified = _validators(scopes(**kwargs), extra_state)
+            per_user = current_user.is_authenticated or extra_state is not None
+            if _not_modified(etag, last_modified, per_user):
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(view(**kwargs))
+                if response.status_code != 200 or '_flashes' in session:
+                    return response
+
+            response.set_etag(etag, weak=True)
+            response.last_modified = last_modified
+            response.headers['Cache-Control'] = 'private, no-cache'
+            response.vary.add('Cookie')
+            return response
+        return wrapper
+    return decorator
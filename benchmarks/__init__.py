@@ -0,0 +1,8 @@
+"""
+Benchmarks for the prediction app.
+
+    python -m benchmarks.run --users 2000 --weeks 38 --save baselines/small.json
+    python -m benchmarks.run --users 2000 --weeks 38 --compare baselines/small.json
+
+See benchmarks/run.py for the options.
+"""
@@ -0,0 +1,121 @@
+"""
+Synthetic league generator.
+
+Fills an (empty) database with one season: teams, weeks, match weeks with
+fixtures, users and a prediction from every user for every fixture, using
+Core executemany batches so millions of rows load in reasonable time. Every
+match week before the last has results; the last one is active and open for
+predictions. The ledger is then built with rebuild_points() so the
+leaderboards have data to read.
+"""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import insert, select
+
+from app import db
+from app.models import Season, Week, Team, MatchWeek, Fixture, User, Prediction, season_week, season_team
+from app.scoring import rebuild_points
+
+BATCH_SIZE = 50_000
+
+
+def _insert(table, rows):
+    for start in range(0, len(rows), BATCH_SIZE):
+        db.session.execute(insert(table), rows[start:start + BATCH_SIZE])
+
+
+def _random_scores(rng, size):
+    # Roughly football-shaped: mostly 0-2 goals, occasionally more.
+    return rng.poisson(1.4, size=size).clip(0, 9)
+
+
+def generate_league(users=1000, weeks=38, fixtures_per_week=10, seed=0):
+    """
+    Generate a season and return a dict of the ids a benchmark needs:
+    ``season_id``, ``open_match_week_id``, ``match_week_ids``, ``user_ids``,
+    ``admin_id`` and the number of ``predictions``.
+    """
+    rng = np.random.default_rng(seed)
+    now = datetime.utcnow()
+    teams_count = fixtures_per_week * 2
+
+    season = Season(season_start_year=now.year, season_end_year=now.year + 1)
+    db.session.add(season)
+    db.session.flush()
+
+    _insert(Week.__table__, [{'week_number': number} for number in range(1, weeks + 1)])
+    _insert(Team.__table__, [{'name': f'Team {i:03d}', 'short_name': f'T{i:03d}', 'created_at': now,
+                              'updated_at': now} for i in range(teams_count)])
+    week_ids = db.session.scalars(select(Week.id).order_by(Week.week_number)).all()[-weeks:]
+    team_ids = np.array(db.session.scalars(select(Team.id).order_by(Team.id)).all()[-teams_count:])
+    db.session.execute(insert(season_week), [{'season_id': season.id, 'week_id': week_id} for week_id in week_ids])
+    db.session.execute(insert(season_team), [{'season_id': season.id, 'team_id': int(team_id)}
+                                              for team_id in team_ids])
+
+    match_week_rows = []
+    for i, week_id in enumerate(week_ids):
+        # Weeks count back from the open one, a week apart.
+        close_time = now + timedelta(days=1) - timedelta(days=7 * (weeks - 1 - i))
+        match_week_rows.append({
+            'season_id': season.id, 'week_id': week_id, 'created_at': now,
+            'predictions_open_time': close_time - timedelta(days=6),
+            'predictions_close_time': close_time,
+            'is_active': i == weeks - 1,
+        })
+    match_week_ids = db.session.scalars(
+        insert(MatchWeek).returning(MatchWeek.id, sort_by_parameter_order=True), match_week_rows
+    ).all()
+
+    fixture_rows = []
+    for i, match_week_id in enumerate(match_week_ids):
+        played = i < weeks - 1
+        pairing = rng.permutation(team_ids)
+        home_scores, away_scores = _random_scores(rng, fixtures_per_week), _random_scores(rng, fixtures_per_week)
+        for j in range(fixtures_per_week):
+            fixture_rows.append({
+                'match_week_id': match_week_id,
+                'home_team_id': int(pairing[2 * j]), 'away_team_id': int(pairing[2 * j + 1]),
+                'match_datetime': match_week_rows[i]['predictions_close_time'] + timedelta(hours=2),
+                'home_score': int(home_scores[j]) if played else None,
+                'away_score': int(away_scores[j]) if played else None,
+                'is_completed': played, 'created_at': now,
+            })
+    fixture_ids = db.session.scalars(
+        insert(Fixture).returning(Fixture.id, sort_by_parameter_order=True), fixture_rows
+    ).all()
+
+    user_ids = db.session.scalars(
+        insert(User).returning(User.id, sort_by_parameter_order=True),
+        [{'email': f'user{i}@example.com', 'name': f'User {i}', 'nickname': f'player{i}',
+          'google_id': f'google-{seed}-{i}', 'is_admin': i == 0, 'created_at': now, 'total_points': 0}
+         for i in range(users)]
+    ).all()
+
+    home_team_ids = [row['home_team_id'] for row in fixture_rows]
+    away_team_ids = [row['away_team_id'] for row in fixture_rows]
+    predictions = 0
+    for user_id in user_ids:
+        home, away = _random_scores(rng, len(fixture_ids)).tolist(), _random_scores(rng, len(fixture_ids)).tolist()
+        rows = [
+            {'user_id': user_id, 'fixture_id': fixture_id, 'home_team_id': home_team_id,
+             'away_team_id': away_team_id, 'home_score_prediction': home_score,
+             'away_score_prediction': away_score, 'points_earned': 0, 'created_at': now, 'updated_at': now}
+            for fixture_id, home_team_id, away_team_id, home_score, away_score
+            in zip(fixture_ids, home_team_ids, away_team_ids, home, away)
+        ]
+        db.session.execute(insert(Prediction.__table__), rows)
+        predictions += len(rows)
+
+    rebuild_points()
+    db.session.commit()
+
+    return {
+        'season_id': season.id,
+        'open_match_week_id': match_week_ids[-1],
+        'match_week_ids': list(match_week_ids),
+        'user_ids': list(user_ids),
+        'admin_id': user_ids[0],
+        'predictions': predictions,
+    }
@@ -0,0 +1,247 @@
+"""
+Benchmark driver.
+
+Generates a synthetic league (benchmarks/league.py) into a temporary SQLite
+database, then drives the Flask test client through the main read and write
+paths and times scoring and exports directly:
+
+    python -m benchmarks.run --users 10000 --weeks 38 --fixtures 10 --save benchmarks/baselines/10k.json
+
+benchmarks/baselines/1k.json is the committed baseline at the default
+scale; compare a change against it with --compare.
+
+For every endpoint it reports throughput, latency percentiles and SQL
+statements per request, and stops at the first 5xx response or the first
+request over its QUERY_BUDGETS entry. --save writes the results as a JSON
+baseline and --compare checks a run against one, exiting non-zero if p95
+latency grew by more than --tolerance (and --min-delta-ms) or any endpoint
+issues more queries than before.
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# Most statements a single request may issue, cold caches included.
+QUERY_BUDGETS = {
+    'GET /': 6,
+    'GET /matches': 4,
+    'POST /matches': 5,
+    'GET /leaderboard': 6,
+    'GET /leaderboard/weekly/<id>': 10,
+    'GET /api/live': 8,
+    'GET /admin': 10,
+}
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    index = min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarise(durations, queries, statuses, elapsed):
+    return {
+        'requests': len(durations),
+        'throughput_per_s': round(len(durations) / elapsed, 2) if elapsed else None,
+        'latency_ms': {
+            'mean': round(sum(durations) / len(durations), 3),
+            'p50': round(percentile(durations, 0.50), 3),
+            'p95': round(percentile(durations, 0.95), 3),
+            'p99': round(percentile(durations, 0.99), 3),
+            'max': round(max(durations), 3),
+        },
+        'queries': {'mean': round(sum(queries) / len(queries), 2), 'max': max(queries)},
+        'statuses': {str(status): statuses.count(status) for status in sorted(set(statuses))},
+    }
+
+
+def measure(name, count, call, results, max_queries=float('inf')):
+    from app.metrics import query_budget, QueryBudgetExceeded
+
+    durations, queries, statuses = [], [], []
+    started = time.perf_counter()
+    for i in range(count):
+        try:
+            with query_budget(max_queries) as recorder:
+                before = time.perf_counter()
+                status = call(i)
+                durations.append((time.perf_counter() - before) * 1000)
+        except QueryBudgetExceeded as e:
+            raise SystemExit(f'{name}: request {i}: {e}') from None
+        queries.append(recorder.count)
+        statuses.append(status)
+        if isinstance(status, int) and status >= 500:
+            # Timings of an app that cannot serve the page are meaningless.
+            raise SystemExit(f'{name}: request {i} failed with HTTP {status}')
+    results[name] = summarise(durations, queries, statuses, time.perf_counter() - started)
+    print(f'{name:32s} p50 {results[name]["latency_ms"]["p50"]:9.2f}ms  '
+          f'p95 {results[name]["latency_ms"]["p95"]:9.2f}ms  '
+          f'{results[name]["queries"]["mean"]:6.1f} queries  {results[name]["statuses"]}')
+
+
+def build_app(database):
+    os.environ['SQLITE_DB_URI'] = f'sqlite:///{database}'
+    from app import create_app
+
+    app = create_app()
+    app.config.update(TESTING=True, WTF_CSRF_ENABLED=False, METRICS_HEADERS=False)
+    return app
+
+
+def login(client, user_id):
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+        session['_fresh'] = True
+
+
+def run(options):
+    database = os.path.join(tempfile.mkdtemp(prefix='epl-bench-'), 'bench.db')
+    app = build_app(database)
+
+    from app import db
+    from app.exports import build_export
+    from app.models import Fixture
+    from app.scoring import score_match_week, rescore_fixtures
+    from benchmarks.league import generate_league
+
+    rng = random.Random(options.seed)
+    results = {}
+    with app.app_context():
+        started = time.perf_counter()
+        league = generate_league(options.users, options.weeks, options.fixtures, seed=options.seed)
+        setup_seconds = time.perf_counter() - started
+        print(f'Generated {league["predictions"]} predictions for {options.users} users in {setup_seconds:.1f}s')
+        open_week = league['open_match_week_id']
+        last_played = league['match_week_ids'][-2] if len(league['match_week_ids']) > 1 else open_week
+        fixture_ids = db.session.scalars(
+            db.select(Fixture.id).where(Fixture.match_week_id == open_week).order_by(Fixture.id)
+        ).all()
+        db.session.remove()
+
+    client = app.test_client()
+    users = league['user_ids']
+
+    def get(path, as_admin=False):
+        def call(i):
+            login(client, league['admin_id'] if as_admin else rng.choice(users))
+            return client.get(path).status_code
+        return call
+
+    def submit_predictions(i):
+        login(client, rng.choice(users))
+        data = {}
+        for j in range(len(fixture_ids)):
+            data[f'matches-{j}-home_team'] = 'Home'
+            data[f'matches-{j}-away_team'] = 'Away'
+            data[f'matches-{j}-home_score'] = rng.randint(0, 4)
+            data[f'matches-{j}-away_score'] = rng.randint(0, 4)
+        return client.post('/matches', data=data).status_code
+
+    # Pages get a fixed query budget that does not grow with the league, so an N+1 fails the run.
+    n = options.requests
+    measure('GET /', n, get('/'), results, max_queries=QUERY_BUDGETS['GET /'])
+    measure('GET /matches', n, get('/matches'), results, max_queries=QUERY_BUDGETS['GET /matches'])
+    measure('POST /matches', n, submit_predictions, results, max_queries=QUERY_BUDGETS['POST /matches'])
+    measure('GET /leaderboard', n, get('/leaderboard'), results, max_queries=QUERY_BUDGETS['GET /leaderboard'])
+    measure('GET /api/leaderboard', n, get('/api/leaderboard'), results,
+            max_queries=QUERY_BUDGETS['GET /leaderboard'])
+    measure('GET /leaderboard/weekly/<id>', n, get(f'/leaderboard/weekly/{last_played}'), results,
+            max_queries=QUERY_BUDGETS['GET /leaderboard/weekly/<id>'])
+    measure('GET /api/live', n, get('/api/live'), results, max_queries=QUERY_BUDGETS['GET /api/live'])
+    measure('GET /admin', max(1, n // 10), get('/admin', as_admin=True), results,
+            max_queries=QUERY_BUDGETS['GET /admin'])
+
+    def in_app(func):
+        def call(i):
+            with app.app_context():
+                func()
+                db.session.commit()
+                db.session.remove()
+            return 'ok'
+        return call
+
+    rounds = options.rounds
+    measure('score_match_week', rounds, in_app(lambda: score_match_week(last_played)), results)
+    measure('rescore_fixtures (1 fixture)', rounds, in_app(lambda: rescore_fixtures(fixture_ids[:1])), results)
+    measure('export weekly pdf', rounds, in_app(
+        lambda: build_export(io.BytesIO(), 'pdf', 'weekly', match_week_id=last_played, title='Weekly')), results)
+    measure('export weekly xlsx', rounds, in_app(
+        lambda: build_export(io.BytesIO(), 'xlsx', 'weekly', match_week_id=last_played, title='Weekly')), results)
+    measure('export overall pdf', rounds, in_app(
+        lambda: build_export(io.BytesIO(), 'pdf', 'overall', title='Leaderboard')), results)
+
+    return {
+        'created_at': datetime.utcnow().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'scale': {'users': options.users, 'weeks': options.weeks, 'fixtures_per_week': options.fixtures,
+                  'predictions': league['predictions'], 'seed': options.seed},
+        'setup_seconds': round(setup_seconds, 2),
+        'endpoints': results,
+    }
+
+
+def compare(report, baseline, tolerance, min_delta_ms):
+    """Return a list of regressions of ``report`` against ``baseline``."""
+    regressions = []
+    if report['scale'] != baseline['scale']:
+        regressions.append(f'scale differs from baseline: {report["scale"]} != {baseline["scale"]}')
+    for name, before in baseline['endpoints'].items():
+        after = report['endpoints'].get(name)
+        if after is None:
+            regressions.append(f'{name}: missing from this run')
+            continue
+        growth = after['latency_ms']['p95'] - before['latency_ms']['p95']
+        if growth > min_delta_ms and after['latency_ms']['p95'] > before['latency_ms']['p95'] * (1 + tolerance):
+            regressions.append(f'{name}: p95 {before["latency_ms"]["p95"]}ms -> {after["latency_ms"]["p95"]}ms')
+        if after['queries']['max'] > before['queries']['max']:
+            regressions.append(f'{name}: queries {before["queries"]["max"]} -> {after["queries"]["max"]}')
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the prediction app against a synthetic league.')
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--weeks', type=int, default=38)
+    parser.add_argument('--fixtures', type=int, default=10, help='fixtures per match week')
+    parser.add_argument('--requests', type=int, default=50, help='requests per endpoint')
+    parser.add_argument('--rounds', type=int, default=3, help='runs of each scoring/export step')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--save', help='write the results to this JSON file')
+    parser.add_argument('--compare', help='compare against this JSON baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed p95 growth, e.g. 0.25 for 25%%')
+    parser.add_argument('--min-delta-ms', type=float, default=2.0,
+                        help='ignore p95 growth smaller than this, which is mostly noise')
+    options = parser.parse_args(argv)
+
+    report = run(options)
+
+    if options.save:
+        os.makedirs(os.path.dirname(os.path.abspath(options.save)), exist_ok=True)
+        with open(options.save, 'w') as fileobj:
+            json.dump(report, fileobj, indent=2, sort_keys=True)
+        print(f'Saved baseline to {options.save}')
+
+    if options.compare:
+        with open(options.compare) as fileobj:
+            regressions = compare(report, json.load(fileobj), options.tolerance, options.min_delta_ms)
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+        if regressions:
+            return 1
+        print('No regressions against baseline.')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,97 @@
+"""prediction and leaderboard indexes
+
+Revision ID: 3f1c2a9d7b10
+Revises: 
+Create Date: 2026-10-18 09:30:00.000000
+
+"""
+import logging
+
+from alembic import op
+import sqlalchemy as sa
+
+logger = logging.getLogger('alembic.runtime.migration')
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c2a9d7b10'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Tables are created by db.create_all(), which already builds these indexes on a fresh
+    # database, so every index is created with if_not_exists.
+
+    _remove_duplicates()
+
+    op.create_index('ix_prediction_user_fixture', 'prediction', ['user_id', 'fixture_id'],
+                    unique=True, if_not_exists=True)
+    op.create_index('ix_prediction_fixture_id', 'prediction', ['fixture_id'], if_not_exists=True)
+    op.create_index('ix_fixture_match_week_id', 'fixture', ['match_week_id'], if_not_exists=True)
+    op.create_index('ix_match_week_point_user_week', 'match_week_point', ['user_id', 'match_week_id'],
+                    unique=True, if_not_exists=True)
+    op.create_index('ix_match_week_point_week_points', 'match_week_point', ['match_week_id', 'points'],
+                    if_not_exists=True)
+    op.create_index('ix_user_total_points', 'user', [sa.text('total_points DESC'), 'id'], if_not_exists=True)
+
+
+def _remove_duplicates():
+    """
+    Keep the newest row of any duplicated key so the unique indexes can be
+    built, then recompute the points, ranks and totals that the removed rows
+    fed into, so User.total_points stays consistent with match_week_point.
+    """
+    conn = op.get_bind()
+    newest_predictions = 'SELECT MAX(id) FROM prediction GROUP BY user_id, fixture_id'
+    newest_points = 'SELECT MAX(id) FROM match_week_point GROUP BY user_id, match_week_id'
+
+    weeks = set(conn.execute(sa.text(
+        'SELECT DISTINCT p.user_id, f.match_week_id FROM prediction p JOIN fixture f ON f.id = p.fixture_id '
+        f'WHERE p.id NOT IN ({newest_predictions})'
+    )).all())
+    weeks |= set(conn.execute(sa.text(
+        f'SELECT DISTINCT user_id, match_week_id FROM match_week_point WHERE id NOT IN ({newest_points})'
+    )).all())
+    if not weeks:
+        return
+
+    removed_predictions = conn.execute(sa.text(
+        f'DELETE FROM prediction WHERE id NOT IN ({newest_predictions})'
+    )).rowcount
+    removed_points = conn.execute(sa.text(
+        f'DELETE FROM match_week_point WHERE id NOT IN ({newest_points})'
+    )).rowcount
+    logger.warning('Removed %d duplicate prediction rows and %d duplicate match_week_point rows',
+                   removed_predictions, removed_points)
+
+    pairs = [{'user_id': user_id, 'match_week_id': match_week_id} for user_id, match_week_id in sorted(weeks)]
+    conn.execute(sa.text(
+        'UPDATE match_week_point SET points = ('
+        ' SELECT COALESCE(SUM(p.points_earned), 0) FROM prediction p JOIN fixture f ON f.id = p.fixture_id'
+        ' WHERE p.user_id = match_week_point.user_id AND f.match_week_id = match_week_point.match_week_id'
+        ') WHERE user_id = :user_id AND match_week_id = :match_week_id'
+    ), pairs)
+    conn.execute(sa.text(
+        'UPDATE match_week_point SET rank = ('
+        ' SELECT COUNT(*) + 1 FROM match_week_point other WHERE other.match_week_id = match_week_point.match_week_id'
+        ' AND COALESCE(other.points, 0) > COALESCE(match_week_point.points, 0)'
+        ') WHERE match_week_id = :match_week_id'
+    ), [{'match_week_id': match_week_id} for match_week_id in sorted({pair['match_week_id'] for pair in pairs})])
+    conn.execute(sa.text(
+        'UPDATE user SET total_points = ('
+        ' SELECT COALESCE(SUM(points), 0) FROM match_week_point WHERE match_week_point.user_id = user.id'
+        ') WHERE id = :user_id'
+    ), [{'user_id': user_id} for user_id in sorted({pair['user_id'] for pair in pairs})])
+    logger.warning('Recomputed points of %d players in %d match weeks',
+                   len({pair['user_id'] for pair in pairs}), len({pair['match_week_id'] for pair in pairs}))
+
+
+def downgrade():
+    op.drop_index('ix_user_total_points', table_name='user')
+    op.drop_index('ix_match_week_point_week_points', table_name='match_week_point')
+    op.drop_index('ix_match_week_point_user_week', table_name='match_week_point')
+    op.drop_index('ix_fixture_match_week_id', table_name='fixture')
+    op.drop_index('ix_prediction_fixture_id', table_name='prediction')
+    op.drop_index('ix_prediction_user_fixture', table_name='prediction')
@@ -0,0 +1,50 @@
+"""leaderboard snapshot tables
+
+Revision ID: 5b8f0d3e9c21
+Revises: c27d9e4b5a13
+Create Date: 2026-10-18 16:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b8f0d3e9c21'
+down_revision = 'c27d9e4b5a13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'leaderboard_snapshot',
+        sa.Column('match_week_id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('generation', sa.Integer(), nullable=False),
+        sa.Column('built_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('match_week_id'),
+        if_not_exists=True
+    )
+    op.create_table(
+        'leaderboard_row',
+        sa.Column('match_week_id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('generation', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('position', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('nickname', sa.String(length=100), nullable=False),
+        sa.Column('rank', sa.Integer(), nullable=False),
+        sa.Column('points', sa.Integer(), nullable=False),
+        sa.Column('previous_rank', sa.Integer(), nullable=True),
+        sa.Column('week_points', sa.JSON(), nullable=True),
+        sa.PrimaryKeyConstraint('match_week_id', 'generation', 'position'),
+        if_not_exists=True
+    )
+    op.create_index('ix_leaderboard_row_user', 'leaderboard_row', ['match_week_id', 'generation', 'user_id'],
+                    if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index('ix_leaderboard_row_user', table_name='leaderboard_row')
+    op.drop_table('leaderboard_row')
+    op.drop_table('leaderboard_snapshot')
@@ -0,0 +1,35 @@
+"""live score table
+
+Revision ID: c27d9e4b5a13
+Revises: 8a4e61c05d2f
+Create Date: 2026-10-18 14:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c27d9e4b5a13'
+down_revision = '8a4e61c05d2f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'live_score',
+        sa.Column('fixture_id', sa.Integer(), nullable=False),
+        sa.Column('home_score', sa.Integer(), nullable=True),
+        sa.Column('away_score', sa.Integer(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['fixture_id'], ['fixture.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('fixture_id'),
+        if_not_exists=True
+    )
+    op.create_index('ix_live_score_updated_at', 'live_score', ['updated_at'], if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index('ix_live_score_updated_at', table_name='live_score')
+    op.drop_table('live_score')
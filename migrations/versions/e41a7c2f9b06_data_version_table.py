@@ -0,0 +1,31 @@
+"""data version table
+
+Revision ID: e41a7c2f9b06
+Revises: 5b8f0d3e9c21
+Create Date: 2026-10-18 19:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e41a7c2f9b06'
+down_revision = '5b8f0d3e9c21'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'data_version',
+        sa.Column('scope', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('scope'),
+        if_not_exists=True
+    )
+
+
+def downgrade():
+    op.drop_table('data_version')